@@ -2,8 +2,10 @@ from .auth import router as auth_router
 from .users import router as users_router
 from .workspaces import router as workspaces_router
 from .documents import router as documents_router
+from .uploads import router as uploads_router
 from .jobs import router as jobs_router
-from .search import router as search_router
+from .events import router as events_router
+from .search import router as search_router, internal_router as search_internal_router
 from .summaries import router as summaries_router
 from .audit_logs import router as audit_logs_router
 
@@ -12,8 +14,11 @@ __all__ = [
     "users_router",
     "workspaces_router",
     "documents_router",
+    "uploads_router",
     "jobs_router",
+    "events_router",
     "search_router",
+    "search_internal_router",
     "summaries_router",
     "audit_logs_router",
 ]
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models.user import User
 from models.audit_log import AuditLog
-from models.workspace import WorkspaceMember, WorkspaceRole, MemberStatus
+from models.workspace import WorkspaceRole
 from schemas.audit_log import AuditLogResponse, AuditLogListResponse
 from utils.auth import get_current_user
+from utils.authorization import workspace_role
 
 router = APIRouter(tags=["Audit Logs"])
 
@@ -14,31 +16,27 @@ router = APIRouter(tags=["Audit Logs"])
 async def get_audit_logs(
     workspace_id: int = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Retrieves audit logs for the tenant or workspace"""
     
     # Check if user is admin or owner
     if workspace_id:
-        member = db.query(WorkspaceMember).filter(
-            WorkspaceMember.workspace_id == workspace_id,
-            WorkspaceMember.user_id == current_user.id,
-            WorkspaceMember.status == MemberStatus.ACTIVE
-        ).first()
+        role = await workspace_role(db, current_user, workspace_id)
         
-        if not member or member.role not in [WorkspaceRole.OWNER, WorkspaceRole.ADMIN]:
+        if role not in [WorkspaceRole.OWNER, WorkspaceRole.ADMIN]:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only workspace owners and admins can view audit logs"
             )
     
     # Get tenant-level logs
-    query = db.query(AuditLog).filter(AuditLog.tenant_id == current_user.tenant_id)
+    query = select(AuditLog).where(AuditLog.tenant_id == current_user.tenant_id)
     
     # TODO: Add filtering by workspace, action, object_type, etc.
     # TODO: Add pagination
     
-    logs = query.order_by(AuditLog.created_at.desc()).limit(100).all()
+    logs = (await db.scalars(query.order_by(AuditLog.created_at.desc()).limit(100))).all()
     
     return AuditLogListResponse(
         items=[AuditLogResponse.model_validate(log) for log in logs]
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models.user import User
 from models.tenant import Tenant
@@ -8,52 +10,61 @@ from schemas.auth import (
     RegisterResponse,
     LoginRequest,
     LoginResponse,
+    RefreshRequest,
+    LogoutRequest,
+    TokenResponse,
     MeResponse,
     SuccessResponse,
     UserResponse,
     TenantResponse,
 )
 from utils.auth import (
-    verify_password,
-    get_password_hash,
+    authenticate_password,
+    hash_password,
     create_access_token,
     create_refresh_token,
+    decode_token,
+    bearer_token,
     get_current_user,
+    add_audit_log,
     create_audit_log,
 )
+from services.token_revocation import revoke_token, broadcast_revocation
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=RegisterResponse)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
     """Register a new user and optionally create a new tenant"""
     
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         (User.email == request.email) | (User.username == request.username)
-    ).first()
+    ))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email or username already exists"
         )
     
+    # Hash before writing anything, so a saturated pool leaves nothing behind
+    hashed_password = await hash_password(request.password)
+    
     # Create or use tenant
     if request.tenant_name:
         tenant = Tenant(name=request.tenant_name)
         db.add(tenant)
-        db.flush()
+        await db.flush()
     else:
         # Default tenant for testing purposes
-        tenant = db.query(Tenant).first()
+        tenant = await db.scalar(select(Tenant).limit(1))
         if not tenant:
             tenant = Tenant(name="Default Tenant")
             db.add(tenant)
-            db.flush()
+            await db.flush()
     
     # Create user
-    hashed_password = get_password_hash(request.password)
     user = User(
         email=request.email,
         username=request.username,
@@ -61,15 +72,16 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
         tenant_id=tenant.id
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await db.refresh(tenant)
     
     # Create tokens
     access_token = create_access_token(data={"sub": user.id})
     refresh_token = create_refresh_token(data={"sub": user.id})
     
     # Create audit log
-    create_audit_log(db, user, "user.registered", "user", user.id)
+    await create_audit_log(db, user, "user.registered", "user", user.id)
     
     return RegisterResponse(
         user=UserResponse.model_validate(user),
@@ -80,15 +92,22 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Authenticate a user and return access credentials"""
     
     # Find user by email or username
-    user = db.query(User).filter(
+    user = await db.scalar(select(User).where(
         (User.email == request.email_or_username) | (User.username == request.email_or_username)
-    ).first()
+    ))
     
-    if not user or not verify_password(request.password, user.hashed_password):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email/username or password"
+        )
+    
+    verified, new_hash = await authenticate_password(request.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/username or password"
@@ -100,12 +119,16 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
             detail="User account is inactive or deleted"
         )
     
+    # Upgrade hashes made with older parameters; saved with the audit log
+    if new_hash:
+        user.hashed_password = new_hash
+    
     # Create tokens
     access_token = create_access_token(data={"sub": user.id})
     refresh_token = create_refresh_token(data={"sub": user.id})
     
     # Create audit log
-    create_audit_log(db, user, "user.logged_in", "user", user.id)
+    await create_audit_log(db, user, "user.logged_in", "user", user.id)
     
     return LoginResponse(
         access_token=access_token,
@@ -114,21 +137,77 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Exchange a refresh token for new access and refresh tokens, revoking the one used"""
+    
+    payload = await decode_token(request.refresh_token, token_type="refresh")
+    user = await db.scalar(select(User).where(
+        User.id == int(payload.get("sub", 0)),
+        User.is_active == True,
+        User.is_deleted == False
+    ))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or inactive"
+        )
+    
+    # Revoking the old token is the single-use check, so concurrent
+    # refreshes with the same token cannot both succeed
+    if not await revoke_token(db, payload["jti"], user.id, payload["exp"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has already been used"
+        )
+    await db.commit()
+    broadcast_revocation(payload["jti"])
+    
+    return TokenResponse(
+        access_token=create_access_token(data={"sub": user.id}),
+        refresh_token=create_refresh_token(data={"sub": user.id})
+    )
+
+
 @router.post("/logout", response_model=SuccessResponse)
-async def logout(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """End the current user session"""
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    authorization: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """End the current user session, revoking its access token and the given refresh token"""
+    
+    payloads = [await decode_token(bearer_token(authorization))]
+    if request and request.refresh_token:
+        payload = await decode_token(request.refresh_token, token_type="refresh")
+        if int(payload.get("sub", 0)) != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Refresh token belongs to another user"
+            )
+        payloads.append(payload)
+    
+    # Tokens issued before revocation was added have no id and simply expire
+    revoked = [
+        payload for payload in payloads
+        if payload.get("jti") and await revoke_token(db, payload["jti"], current_user.id, payload["exp"])
+    ]
     
     # Create audit log
-    create_audit_log(db, current_user, "user.logged_out", "user", current_user.id)
+    add_audit_log(db, current_user, "user.logged_out", "user", current_user.id)
+    await db.commit()
+    for payload in revoked:
+        broadcast_revocation(payload["jti"])
     
     return SuccessResponse()
 
 
 @router.get("/me", response_model=MeResponse)
-async def get_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_me(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Returns the currently authenticated user and tenant context"""
     
-    tenant = db.query(Tenant).filter(Tenant.id == current_user.tenant_id).first()
+    tenant = await db.get(Tenant, current_user.tenant_id)
     if not tenant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,67 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from config import settings
 from database import get_db
 from models.user import User
 from models.document import Document, DocumentStatus
-from models.workspace import WorkspaceMember, MemberStatus
 from schemas.document import (
     DocumentResponse,
     DocumentListResponse,
     UpdateDocumentRequest,
     DownloadResponse,
+    BulkUploadResult,
+    BulkUploadResponse,
 )
 from schemas.auth import SuccessResponse
-from utils.auth import get_current_user, create_audit_log
+from services.storage import StorageBackend, get_storage, digest_upload
+from services.blobs import acquire_blob, acquire_blobs, release_blob
+from services.documents import register_document, register_documents
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from services.downloads import create_download_url, read_download_token, build_download_response
+from services.jobs import detach_jobs
+from services.generations import bump_search_generation
+from utils.auth import get_current_user, add_audit_log, create_audit_log
+from utils.authorization import check_document_access, check_workspace_membership
 
 router = APIRouter(tags=["Documents"])
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_BULK_FILES = 500
+# Only types services.extraction can extract; anything else would be stored only to fail processing
 ALLOWED_MIME_TYPES = [
     "application/pdf",
     "text/plain",
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-    "application/msword",
 ]
 
 
-def check_document_access(document_id: int, user: User, db: Session) -> Document:
-    """Check if user has access to a document"""
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if not document:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
-    
-    # Check workspace membership
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == document.workspace_id,
-        WorkspaceMember.user_id == user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-    
-    return document
-
-
 @router.post("/workspaces/{workspace_id}/documents", response_model=DocumentResponse)
 async def upload_document(
     workspace_id: int,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     """Uploads a document to a workspace"""
     
-    # Check workspace membership
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == workspace_id,
-        WorkspaceMember.user_id == current_user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of this workspace")
+    await check_workspace_membership(workspace_id, current_user, db)
     
     # Validate file
     if not file.content_type or file.content_type not in ALLOWED_MIME_TYPES:
@@ -70,65 +59,122 @@ async def upload_document(
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_MIME_TYPES)}"
         )
     
-    # Read file content to check size
-    content = await file.read()
-    size_bytes = len(content)
+    # Stream the file into content-addressed storage; known content is not written again
+    blob, created = await acquire_blob(db, storage, file, MAX_FILE_SIZE)
+    
+    # Create document record
+    document = await db.run_sync(
+        register_document, workspace_id, current_user, file.filename, file.content_type, blob, created
+    )
+    await db.commit()
+    await db.refresh(document)
+    
+    await create_audit_log(db, current_user, "document.uploaded", "document", document.id)
+    
+    return DocumentResponse.model_validate(document)
+
+
+@router.post("/workspaces/{workspace_id}/documents/bulk", response_model=BulkUploadResponse)
+async def bulk_upload_documents(
+    workspace_id: int,
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """Uploads many documents to a workspace in one request, reporting results per file"""
+    
+    # Check workspace membership once for the whole batch
+    await check_workspace_membership(workspace_id, current_user, db)
     
-    if size_bytes > MAX_FILE_SIZE:
+    if len(files) > MAX_BULK_FILES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024}MB"
+            detail=f"Too many files. Maximum per request: {MAX_BULK_FILES}"
         )
     
-    # TODO: Actually upload to storage (S3/MinIO)
-    # For now, just create a placeholder storage path
-    storage_path = f"workspaces/{workspace_id}/documents/{file.filename}"
-    
-    # Create document record
-    document = Document(
-        workspace_id=workspace_id,
-        uploaded_by=current_user.id,
-        filename=file.filename,
-        mime_type=file.content_type,
-        size_bytes=size_bytes,
-        storage_path=storage_path,
-        status=DocumentStatus.PENDING
-    )
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-    
-    create_audit_log(db, current_user, "document.uploaded", "document", document.id)
+    results = [BulkUploadResult(filename=file.filename or "") for file in files]
+    
+    # Validate and hash every file; rejected files do not affect the rest of the batch
+    accepted = []
+    for index, file in enumerate(files):
+        if not file.content_type or file.content_type not in ALLOWED_MIME_TYPES:
+            results[index].error = f"File type not allowed. Allowed types: {', '.join(ALLOWED_MIME_TYPES)}"
+            continue
+        try:
+            digest = await digest_upload(file, MAX_FILE_SIZE)
+        except HTTPException as e:
+            results[index].error = e.detail
+            continue
+        accepted.append((index, file, digest))
+    
+    # Stream new content to storage and register all blobs together
+    stored = await acquire_blobs(db, storage, [(file, digest) for _, file, digest in accepted])
+    
+    entries = []
+    entry_indexes = []
+    for (index, file, _), outcome in zip(accepted, stored):
+        if isinstance(outcome, Exception):
+            results[index].error = "Failed to store file"
+            continue
+        blob, created = outcome
+        entries.append((file.filename, file.content_type, blob, created))
+        entry_indexes.append(index)
+    
+    # Insert documents, jobs and audit entries in a single transaction
+    documents = await db.run_sync(register_documents, workspace_id, current_user, entries)
+    for document in documents:
+        add_audit_log(db, current_user, "document.uploaded", "document", document.id)
+    document_ids = [document.id for document in documents]
+    await db.commit()
+    
+    # Reload the committed rows with one query rather than one refresh per document
+    if document_ids:
+        await db.execute(
+            select(Document).where(Document.id.in_(document_ids)),
+            execution_options={"populate_existing": True}
+        )
     
-    # TODO: Trigger background job for processing
+    for index, document in zip(entry_indexes, documents):
+        results[index].document = DocumentResponse.model_validate(document)
     
-    return DocumentResponse.model_validate(document)
+    return BulkUploadResponse(items=results)
 
 
 @router.get("/workspaces/{workspace_id}/documents", response_model=DocumentListResponse)
 async def list_documents(
     workspace_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Lists documents in a workspace"""
     
-    # Check workspace membership
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == workspace_id,
-        WorkspaceMember.user_id == current_user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
+    await check_workspace_membership(workspace_id, current_user, db)
     
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of this workspace")
+    query = select(Document).where(Document.workspace_id == workspace_id)
+    
+    # Seek past the last row of the previous page instead of using OFFSET. The anchor
+    # timestamp is read back from the row itself so it compares exactly in every dialect.
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        anchor_document = aliased(Document)
+        anchor = select(anchor_document.created_at).where(anchor_document.id == last_id).scalar_subquery()
+        query = query.where(
+            tuple_(Document.created_at, Document.id) < tuple_(func.coalesce(anchor, created_at), last_id)
+        )
     
-    documents = db.query(Document).filter(
-        Document.workspace_id == workspace_id
-    ).order_by(Document.created_at.desc()).all()
+    documents = (await db.scalars(query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit + 1))).all()
+    
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id)
     
     return DocumentListResponse(
-        items=[DocumentResponse.model_validate(d) for d in documents]
+        items=[DocumentResponse.model_validate(d) for d in documents],
+        next_cursor=next_cursor
     )
 
 
@@ -136,11 +182,11 @@ async def list_documents(
 async def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Retrieves document metadata"""
     
-    document = check_document_access(document_id, current_user, db)
+    document = await check_document_access(document_id, current_user, db)
     return DocumentResponse.model_validate(document)
 
 
@@ -149,19 +195,20 @@ async def update_document(
     document_id: int,
     request: UpdateDocumentRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Updates document metadata"""
     
-    document = check_document_access(document_id, current_user, db)
+    document = await check_document_access(document_id, current_user, db)
     
     if request.filename:
         document.filename = request.filename
+        await db.run_sync(bump_search_generation, [document.workspace_id])
     
-    db.commit()
-    db.refresh(document)
+    await db.commit()
+    await db.refresh(document)
     
-    create_audit_log(db, current_user, "document.updated", "document", document.id)
+    await create_audit_log(db, current_user, "document.updated", "document", document.id)
     
     return DocumentResponse.model_validate(document)
 
@@ -170,39 +217,75 @@ async def update_document(
 async def download_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     """Downloads a document or returns a pre-signed URL"""
     
-    document = check_document_access(document_id, current_user, db)
+    document = await check_document_access(document_id, current_user, db)
+    
+    await create_audit_log(db, current_user, "document.downloaded", "document", document.id)
     
-    create_audit_log(db, current_user, "document.downloaded", "document", document.id)
+    # Backends with native pre-signed URLs serve the bytes themselves
+    url = await run_in_threadpool(
+        storage.presigned_url,
+        document.storage_path,
+        document.filename,
+        document.mime_type,
+        settings.download_url_ttl_seconds
+    )
+    if url:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.download_url_ttl_seconds)
+        return DownloadResponse(url=url, expires_at=expires_at)
     
-    # TODO: Generate actual pre-signed URL from S3/MinIO
-    # For now, return a placeholder
-    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    # Otherwise hand out a signed link to the streaming endpoint below
+    url, expires_at = create_download_url(document)
     
     return DownloadResponse(
-        url=f"/storage/{document.storage_path}",
+        url=url,
         expires_at=expires_at
     )
 
 
+@router.api_route("/downloads/{token}", methods=["GET", "HEAD"])
+async def serve_download(
+    token: str,
+    request: Request,
+    storage: StorageBackend = Depends(get_storage)
+):
+    """Streams document content for a signed download link, supporting range requests"""
+    
+    # The signature already proves access, so range requests cost no database queries
+    payload = read_download_token(token)
+    return build_download_response(payload, request, storage)
+
+
 @router.delete("/documents/{document_id}", response_model=SuccessResponse)
 async def delete_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     """Deletes a document"""
     
-    document = check_document_access(document_id, current_user, db)
+    document = await check_document_access(document_id, current_user, db)
+    blob_id = document.blob_id
+    storage_path = document.storage_path
+    
+    await db.run_sync(detach_jobs, document)
+    await db.run_sync(bump_search_generation, [document.workspace_id])
+    await db.delete(document)
+    await db.flush()
     
-    # TODO: Delete from storage (S3/MinIO)
+    if blob_id is not None:
+        await release_blob(db, storage, blob_id)
+    await db.commit()
     
-    db.delete(document)
-    db.commit()
+    if blob_id is None:
+        # Documents stored before content addressing own their object outright
+        await run_in_threadpool(storage.delete, storage_path)
     
-    create_audit_log(db, current_user, "document.deleted", "document", document_id)
+    await create_audit_log(db, current_user, "document.deleted", "document", document_id)
     
     return SuccessResponse()
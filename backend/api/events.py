@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from models.user import User
+from utils.auth import get_current_user
+from utils.authorization import check_workspace_membership
+from services.events import stream_events
+
+router = APIRouter(tags=["Events"])
+
+
+@router.get("/workspaces/{workspace_id}/events")
+async def stream_workspace_events(
+    workspace_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Streams job and document status changes in a workspace as Server-Sent Events"""
+    
+    await check_workspace_membership(workspace_id, current_user, db)
+    
+    # Return the connection to the pool now; the stream can stay open for hours
+    await db.close()
+    
+    return StreamingResponse(
+        stream_events(request, workspace_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
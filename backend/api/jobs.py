@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from database import get_db
 from models.user import User
-from models.job import Job
-from models.document import Document
-from models.workspace import WorkspaceMember, MemberStatus
+from models.job import Job, JobStatus
 from schemas.job import JobResponse, JobListResponse
 from utils.auth import get_current_user
+from utils.authorization import check_document_access, check_job_access
+from services.queue import retry_job
 
 router = APIRouter(tags=["Jobs"])
 
@@ -14,26 +16,18 @@ router = APIRouter(tags=["Jobs"])
 @router.get("/documents/{document_id}/jobs", response_model=JobListResponse)
 async def list_document_jobs(
     document_id: int,
+    job_status: Optional[JobStatus] = Query(None, alias="status"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Lists processing jobs associated with a document"""
     
-    # Check document access
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if not document:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    await check_document_access(document_id, current_user, db)
     
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == document.workspace_id,
-        WorkspaceMember.user_id == current_user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-    
-    jobs = db.query(Job).filter(Job.document_id == document_id).all()
+    query = select(Job).where(Job.document_id == document_id)
+    if job_status is not None:
+        query = query.where(Job.status == job_status)
+    jobs = (await db.scalars(query.order_by(Job.id))).all()
     
     return JobListResponse(
         items=[JobResponse.model_validate(j) for j in jobs]
@@ -44,26 +38,30 @@ async def list_document_jobs(
 async def get_job(
     job_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Retrieves details for a specific processing job"""
     
-    job = db.query(Job).filter(Job.id == job_id).first()
-    if not job:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    job = await check_job_access(job_id, current_user, db)
+    
+    return JobResponse.model_validate(job)
+
+
+@router.post("/jobs/{job_id}/retry", response_model=JobResponse)
+async def retry_dead_letter_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Requeues a job that was moved to the dead-letter state"""
     
-    # Check document access
-    document = db.query(Document).filter(Document.id == job.document_id).first()
-    if not document:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    job = await check_job_access(job_id, current_user, db, lock=True)
     
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == document.workspace_id,
-        WorkspaceMember.user_id == current_user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
+    if job.status != JobStatus.DEAD_LETTER:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only dead-lettered jobs can be retried")
     
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    await db.run_sync(retry_job, job)
+    await db.commit()
+    await db.refresh(job)
     
     return JobResponse.model_validate(job)
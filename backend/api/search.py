@@ -1,37 +1,162 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+import time
 from database import get_db
 from models.user import User
-from models.workspace import WorkspaceMember, MemberStatus
-from schemas.search import SearchRequest, SearchResponse, SearchResultItem
+from schemas.search import (
+    SearchRequest, SearchResponse, SearchResultItem, SearchCacheStatsResponse,
+    BatchSearchRequest, BatchSearchResponse
+)
 from utils.auth import get_current_user
+from utils.authorization import check_workspace_membership
+from services.search import MAX_BATCH_QUERIES, SearchHit, run_search, run_search_batch
+from services.search_cache import get_search_cache, search_cache_key
+from services.generations import search_generation
 
 router = APIRouter(tags=["Search"])
+# Operational endpoints, mounted only where INTERNAL_ENDPOINTS_ENABLED is set
+internal_router = APIRouter(tags=["Search"])
+
+
+def result_item(hit: SearchHit) -> SearchResultItem:
+    return SearchResultItem(
+        document_id=hit.document_id,
+        chunk_id=hit.chunk_id,
+        score=hit.score,
+        snippet=hit.snippet,
+        filename=hit.filename,
+        created_at=hit.created_at
+    )
 
 
 @router.post("/search", response_model=SearchResponse)
 async def search(
     request: SearchRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Performs keyword or semantic search across authorized documents"""
+    """Performs keyword, semantic or hybrid search across authorized documents"""
+    
+    started = time.perf_counter()
     
-    # Check workspace membership
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == request.workspace_id,
-        WorkspaceMember.user_id == current_user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
+    await check_workspace_membership(request.workspace_id, current_user, db)
     
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of this workspace")
+    generation = await db.run_sync(search_generation, request.workspace_id)
+    authorization_ms = (time.perf_counter() - started) * 1000
+    # Each search leg runs on its own session; don't hold this connection meanwhile
+    await db.close()
     
-    # TODO: Implement actual search logic with embeddings/text search
-    # For now, return empty results
+    limit = request.limit
+    
+    # Any change to the workspace's documents bumps the generation, so a
+    # cached entry is never stale, it just stops being looked up
+    cache = get_search_cache()
+    filters = request.filters.model_dump(mode="json", exclude_none=True) if request.filters else None
+    key = search_cache_key(request.workspace_id, generation, request.query, request.mode, filters, limit)
+    cache_started = time.perf_counter()
+    hits = await run_in_threadpool(cache.get, key) if cache else None
+    cached = hits is not None
+    
+    if cached:
+        timings = {"cache": (time.perf_counter() - cache_started) * 1000}
+    else:
+        hits, timings = await run_search(
+            request.workspace_id, request.query, request.mode, limit, request.filters
+        )
+        if cache:
+            await run_in_threadpool(cache.set, key, hits)
+    timings["authorization"] = authorization_ms
+    timings["total"] = (time.perf_counter() - started) * 1000
     
     return SearchResponse(
         query=request.query,
-        items=[]
+        mode=request.mode,
+        cached=cached,
+        timings=timings,
+        items=[result_item(hit) for hit in hits]
     )
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Runs many searches against one workspace, authorizing once"""
+    
+    started = time.perf_counter()
+    
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_QUERIES} queries per batch"
+        )
+    
+    await check_workspace_membership(request.workspace_id, current_user, db)
+    
+    generation = await db.run_sync(search_generation, request.workspace_id)
+    authorization_ms = (time.perf_counter() - started) * 1000
+    await db.close()
+    
+    searches = [
+        (item.query, item.mode, item.limit, item.filters)
+        for item in request.queries
+    ]
+    cache = get_search_cache()
+    keys = [
+        search_cache_key(
+            request.workspace_id,
+            generation,
+            query,
+            mode,
+            filters.model_dump(mode="json", exclude_none=True) if filters else None,
+            limit
+        )
+        for query, mode, limit, filters in searches
+    ]
+    
+    cache_started = time.perf_counter()
+    cached_hits = await run_in_threadpool(lambda: [cache.get(key) for key in keys]) if cache else [None] * len(keys)
+    timings = {"cache": (time.perf_counter() - cache_started) * 1000}
+    
+    misses = [position for position, hits in enumerate(cached_hits) if hits is None]
+    results = list(cached_hits)
+    if misses:
+        miss_hits, search_timings = await run_search_batch(request.workspace_id, [searches[position] for position in misses])
+        timings.update(search_timings)
+        for position, hits in zip(misses, miss_hits):
+            results[position] = hits
+        if cache:
+            await run_in_threadpool(lambda: [cache.set(keys[position], results[position]) for position in misses])
+    timings["authorization"] = authorization_ms
+    timings["total"] = (time.perf_counter() - started) * 1000
+    
+    return BatchSearchResponse(
+        timings=timings,
+        results=[
+            SearchResponse(
+                query=query,
+                mode=mode,
+                cached=hits is not None,
+                items=[result_item(hit) for hit in results[position]]
+            )
+            for position, ((query, mode, _, _), hits) in enumerate(zip(searches, cached_hits))
+        ]
+    )
+
+
+@internal_router.get("/search/cache/stats", response_model=SearchCacheStatsResponse)
+async def get_search_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Reports search result cache hit rate"""
+    
+    cache = get_search_cache()
+    if cache is None:
+        return SearchCacheStatsResponse(backend="none", hits=0, misses=0, hit_rate=0.0)
+    
+    stats = await run_in_threadpool(cache.stats)
+    
+    return SearchCacheStatsResponse(**stats)
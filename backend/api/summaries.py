@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from database import get_db
 from models.user import User
-from models.document import Document
-from models.workspace import WorkspaceMember, MemberStatus
 from schemas.summary import SummaryRequest, SummaryResponse, ErrorResponse, ErrorDetail
 from utils.auth import get_current_user
+from utils.authorization import check_document_access
+from services.summaries import SummaryError, get_or_create_document_summary, stream_summary
 
 router = APIRouter(tags=["Summaries"])
 
@@ -15,33 +16,23 @@ router = APIRouter(tags=["Summaries"])
 async def create_summary(
     request: SummaryRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Generates an AI-assisted summary of a document or selected chunks"""
     
-    # Check document access
-    document = db.query(Document).filter(Document.id == request.document_id).first()
-    if not document:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    await check_document_access(request.document_id, current_user, db)
     
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == document.workspace_id,
-        WorkspaceMember.user_id == current_user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-    
-    # TODO: Implement actual AI summarization
-    # For now, return a placeholder
+    # Generation runs in a thread on its own session, so return this connection first
+    await db.close()
     
     try:
-        summary_text = "Summary generation is not yet implemented."
-        
-        return SummaryResponse(
-            summary_text=summary_text,
-            created_at=datetime.now(timezone.utc)
+        summary, cached = await run_in_threadpool(
+            get_or_create_document_summary, request.document_id, request.chunk_ids, request.instructions
+        )
+    except SummaryError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"code": "SUMMARY_UNAVAILABLE", "message": str(e)}
         )
     except Exception as e:
         # Return error response
@@ -49,3 +40,30 @@ async def create_summary(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={"code": "SUMMARY_GENERATION_FAILED", "message": str(e)}
         )
+    
+    return SummaryResponse(
+        summary_text=summary.summary_text,
+        created_at=summary.created_at,
+        cached=cached,
+        model_version=summary.model_version
+    )
+
+
+@router.post("/summaries/stream")
+async def stream_summary_events(
+    request: SummaryRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Streams a summary as Server-Sent Events while it is generated"""
+    
+    await check_document_access(request.document_id, current_user, db)
+    
+    # The stream uses its own session; don't hold this connection while it runs
+    await db.close()
+    
+    return StreamingResponse(
+        stream_summary(request.document_id, request.chunk_ids, request.instructions),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,249 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from database import get_db
+from models.user import User
+from models.document import Document
+from models.upload_session import UploadSession, UploadSessionStatus, UploadPart
+from schemas.document import DocumentResponse
+from schemas.upload import CreateUploadSessionRequest, UploadPartResponse, UploadSessionResponse
+from schemas.auth import SuccessResponse
+from services.storage import StorageBackend, get_storage, write_stream, file_too_large
+from services.blobs import acquire_blob_from_parts
+from services.documents import register_document
+from services.uploads import part_key, is_expired, drop_parts, delete_part_objects
+from utils.auth import get_current_user, create_audit_log
+from utils.authorization import check_workspace_membership
+from api.documents import MAX_FILE_SIZE, ALLOWED_MIME_TYPES
+
+router = APIRouter(tags=["Uploads"])
+
+UPLOAD_SESSION_TTL = timedelta(hours=24)
+MAX_PARTS = 10000
+
+
+async def get_upload_session(upload_id: int, user: User, db: AsyncSession, lock: bool = False) -> UploadSession:
+    """Fetch an upload session owned by the user"""
+    query = select(UploadSession).where(UploadSession.id == upload_id)
+    if lock:
+        query = query.with_for_update()
+    session = await db.scalar(query)
+    
+    if not session or session.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    
+    return session
+
+
+def check_session_active(session: UploadSession) -> None:
+    """Check that an upload session still accepts parts"""
+    if session.status != UploadSessionStatus.ACTIVE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Upload session is {session.status.value}")
+    if is_expired(session):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload session has expired")
+
+
+async def build_session_response(session: UploadSession, db: AsyncSession) -> UploadSessionResponse:
+    parts = (await db.scalars(select(UploadPart).where(
+        UploadPart.session_id == session.id
+    ).order_by(UploadPart.part_number))).all()
+    
+    return UploadSessionResponse(
+        id=session.id,
+        workspace_id=session.workspace_id,
+        filename=session.filename,
+        mime_type=session.mime_type,
+        status=session.status.value,
+        parts=[UploadPartResponse.model_validate(p) for p in parts],
+        document_id=session.document_id,
+        expires_at=session.expires_at,
+        created_at=session.created_at
+    )
+
+
+@router.post("/workspaces/{workspace_id}/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(
+    workspace_id: int,
+    request: CreateUploadSessionRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Starts a resumable multipart upload into a workspace"""
+    
+    await check_workspace_membership(workspace_id, current_user, db)
+    
+    if request.mime_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_MIME_TYPES)}"
+        )
+    
+    session = UploadSession(
+        workspace_id=workspace_id,
+        user_id=current_user.id,
+        filename=request.filename,
+        mime_type=request.mime_type,
+        status=UploadSessionStatus.ACTIVE,
+        expires_at=datetime.now(timezone.utc) + UPLOAD_SESSION_TTL
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    
+    return await build_session_response(session, db)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session_status(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Returns an upload session and the parts received so far, for resuming"""
+    
+    session = await get_upload_session(upload_id, current_user, db)
+    return await build_session_response(session, db)
+
+
+@router.put("/uploads/{upload_id}/parts/{part_number}", response_model=UploadPartResponse)
+async def upload_part(
+    upload_id: int,
+    part_number: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """Stores one numbered part of an upload; parts may arrive in any order and in parallel"""
+    
+    if part_number < 1 or part_number > MAX_PARTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Part number must be between 1 and {MAX_PARTS}"
+        )
+    
+    session = await get_upload_session(upload_id, current_user, db)
+    check_session_active(session)
+    
+    # The part may use whatever the other parts have left of the size limit
+    received_bytes = await db.scalar(select(func.coalesce(func.sum(UploadPart.size_bytes), 0)).where(
+        UploadPart.session_id == session.id,
+        UploadPart.part_number != part_number
+    ))
+    
+    storage_path = part_key(session.id, part_number)
+    digest = await write_stream(
+        request.stream(),
+        storage,
+        storage_path,
+        MAX_FILE_SIZE - received_bytes,
+        file_too_large(MAX_FILE_SIZE)
+    )
+    
+    # Record the part, replacing an earlier attempt at the same part number
+    replaced_path = None
+    part_query = select(UploadPart).where(
+        UploadPart.session_id == session.id,
+        UploadPart.part_number == part_number
+    ).with_for_update()
+    part = await db.scalar(part_query)
+    if part is None:
+        try:
+            async with db.begin_nested():
+                part = UploadPart(session_id=session.id, part_number=part_number, size_bytes=digest.size_bytes, sha256=digest.sha256, storage_path=storage_path)
+                db.add(part)
+        except IntegrityError:
+            part = await db.scalar(part_query)
+    if part.storage_path != storage_path:
+        replaced_path = part.storage_path
+        part.size_bytes = digest.size_bytes
+        part.sha256 = digest.sha256
+        part.storage_path = storage_path
+    await db.commit()
+    await db.refresh(part)
+    
+    if replaced_path:
+        await run_in_threadpool(storage.delete, replaced_path)
+    
+    return UploadPartResponse.model_validate(part)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=DocumentResponse)
+async def complete_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """Assembles the received parts into a document"""
+    
+    session = await get_upload_session(upload_id, current_user, db, lock=True)
+    
+    # Completing twice returns the same document, so clients can retry safely
+    if session.status == UploadSessionStatus.COMPLETED:
+        document = await db.get(Document, session.document_id)
+        if not document:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+        return DocumentResponse.model_validate(document)
+    
+    check_session_active(session)
+    await check_workspace_membership(session.workspace_id, current_user, db)
+    
+    parts = (await db.scalars(select(UploadPart).where(
+        UploadPart.session_id == session.id
+    ).order_by(UploadPart.part_number))).all()
+    
+    if not parts:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No parts have been uploaded")
+    
+    missing = sorted(set(range(1, parts[-1].part_number + 1)) - {p.part_number for p in parts})
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing parts: {', '.join(str(n) for n in missing)}"
+        )
+    
+    if sum(p.size_bytes for p in parts) > MAX_FILE_SIZE:
+        raise file_too_large(MAX_FILE_SIZE)
+    
+    # Assemble the parts in storage and create the document in one transaction
+    blob, created = await acquire_blob_from_parts(db, storage, [p.storage_path for p in parts])
+    document = await db.run_sync(
+        register_document, session.workspace_id, current_user, session.filename, session.mime_type, blob, created
+    )
+    
+    session.status = UploadSessionStatus.COMPLETED
+    session.document_id = document.id
+    part_paths = await db.run_sync(drop_parts, session)
+    await db.commit()
+    await db.refresh(document)
+    
+    await delete_part_objects(storage, part_paths)
+    
+    await create_audit_log(db, current_user, "document.uploaded", "document", document.id)
+    
+    return DocumentResponse.model_validate(document)
+
+
+@router.delete("/uploads/{upload_id}", response_model=SuccessResponse)
+async def abort_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """Aborts an upload session and discards its parts"""
+    
+    session = await get_upload_session(upload_id, current_user, db, lock=True)
+    check_session_active(session)
+    
+    session.status = UploadSessionStatus.ABORTED
+    part_paths = await db.run_sync(drop_parts, session)
+    await db.commit()
+    
+    await delete_part_objects(storage, part_paths)
+    
+    return SuccessResponse()
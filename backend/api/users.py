@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models.user import User
 from schemas.auth import SuccessResponse
 from utils.auth import get_current_user, create_audit_log
+from services.principals import invalidate_principal
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.delete("/me", response_model=SuccessResponse)
-async def delete_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_me(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Soft deletes the authenticated user account"""
     
     current_user.is_deleted = True
     current_user.is_active = False
-    db.commit()
+    await db.commit()
+    invalidate_principal(current_user.id)
     
     # Create audit log
-    create_audit_log(db, current_user, "user.deleted", "user", current_user.id)
+    await create_audit_log(db, current_user, "user.deleted", "user", current_user.id)
     
     return SuccessResponse()
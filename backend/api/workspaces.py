@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models.user import User
 from models.workspace import Workspace, WorkspaceMember, WorkspaceRole, MemberStatus
@@ -16,39 +16,17 @@ from schemas.workspace import (
 )
 from schemas.auth import SuccessResponse
 from utils.auth import get_current_user, create_audit_log
+from utils.authorization import check_workspace_access
+from services.workspace_roles import invalidate_workspace_roles
 
 router = APIRouter(prefix="/workspaces", tags=["Workspaces"])
 
 
-def check_workspace_access(workspace_id: int, user: User, db: Session, required_roles: Optional[list] = None) -> Workspace:
-    """Check if user has access to workspace and optionally verify role"""
-    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
-    if not workspace:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
-    
-    if workspace.tenant_id != user.tenant_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-    
-    member = db.query(WorkspaceMember).filter(
-        WorkspaceMember.workspace_id == workspace_id,
-        WorkspaceMember.user_id == user.id,
-        WorkspaceMember.status == MemberStatus.ACTIVE
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of this workspace")
-    
-    if required_roles and member.role not in required_roles:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-    
-    return workspace
-
-
 @router.post("", response_model=WorkspaceResponse)
 async def create_workspace(
     request: CreateWorkspaceRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Creates a new workspace within the tenant"""
     
@@ -58,7 +36,7 @@ async def create_workspace(
         created_by=current_user.id
     )
     db.add(workspace)
-    db.flush()
+    await db.flush()
     
     # Add creator as owner
     member = WorkspaceMember(
@@ -68,10 +46,11 @@ async def create_workspace(
         status=MemberStatus.ACTIVE
     )
     db.add(member)
-    db.commit()
-    db.refresh(workspace)
+    await db.commit()
+    invalidate_workspace_roles(workspace.id, current_user.id)
+    await db.refresh(workspace)
     
-    create_audit_log(db, current_user, "workspace.created", "workspace", workspace.id)
+    await create_audit_log(db, current_user, "workspace.created", "workspace", workspace.id)
     
     return WorkspaceResponse.model_validate(workspace)
 
@@ -79,15 +58,15 @@ async def create_workspace(
 @router.get("", response_model=WorkspaceListResponse)
 async def list_workspaces(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Lists workspaces the user is a member of"""
     
-    member_workspaces = db.query(Workspace).join(WorkspaceMember).filter(
+    member_workspaces = (await db.scalars(select(Workspace).join(WorkspaceMember).where(
         WorkspaceMember.user_id == current_user.id,
         WorkspaceMember.status == MemberStatus.ACTIVE,
         Workspace.tenant_id == current_user.tenant_id
-    ).all()
+    ))).all()
     
     return WorkspaceListResponse(
         items=[WorkspaceResponse.model_validate(w) for w in member_workspaces]
@@ -98,11 +77,11 @@ async def list_workspaces(
 async def get_workspace(
     workspace_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Retrieves details for a specific workspace"""
     
-    workspace = check_workspace_access(workspace_id, current_user, db)
+    workspace = await check_workspace_access(workspace_id, current_user, db)
     return WorkspaceResponse.model_validate(workspace)
 
 
@@ -111,17 +90,17 @@ async def update_workspace(
     workspace_id: int,
     request: UpdateWorkspaceRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Updates workspace metadata"""
     
-    workspace = check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
+    workspace = await check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
     
     workspace.name = request.name
-    db.commit()
-    db.refresh(workspace)
+    await db.commit()
+    await db.refresh(workspace)
     
-    create_audit_log(db, current_user, "workspace.updated", "workspace", workspace.id)
+    await create_audit_log(db, current_user, "workspace.updated", "workspace", workspace.id)
     
     return WorkspaceResponse.model_validate(workspace)
 
@@ -130,18 +109,19 @@ async def update_workspace(
 async def delete_workspace(
     workspace_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Deletes a workspace"""
     
-    workspace = check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER])
+    workspace = await check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER])
     
     # Delete all members first
-    db.query(WorkspaceMember).filter(WorkspaceMember.workspace_id == workspace_id).delete()
-    db.delete(workspace)
-    db.commit()
+    await db.execute(delete(WorkspaceMember).where(WorkspaceMember.workspace_id == workspace_id))
+    await db.delete(workspace)
+    await db.commit()
+    invalidate_workspace_roles(workspace_id)
     
-    create_audit_log(db, current_user, "workspace.deleted", "workspace", workspace_id)
+    await create_audit_log(db, current_user, "workspace.deleted", "workspace", workspace_id)
     
     return SuccessResponse()
 
@@ -150,15 +130,15 @@ async def delete_workspace(
 async def list_workspace_members(
     workspace_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Lists members of a workspace"""
     
-    check_workspace_access(workspace_id, current_user, db)
+    await check_workspace_access(workspace_id, current_user, db)
     
-    members = db.query(WorkspaceMember).filter(
+    members = (await db.scalars(select(WorkspaceMember).where(
         WorkspaceMember.workspace_id == workspace_id
-    ).all()
+    ))).all()
     
     return WorkspaceMemberListResponse(
         items=[WorkspaceMemberResponse.model_validate(m) for m in members]
@@ -170,17 +150,17 @@ async def add_workspace_member(
     workspace_id: int,
     request: AddMemberRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Adds a user to a workspace"""
     
-    check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
+    await check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
     
     # Find user by email or ID
     if request.email_or_user_id.isdigit():
-        target_user = db.query(User).filter(User.id == int(request.email_or_user_id)).first()
+        target_user = await db.get(User, int(request.email_or_user_id))
     else:
-        target_user = db.query(User).filter(User.email == request.email_or_user_id).first()
+        target_user = await db.scalar(select(User).where(User.email == request.email_or_user_id))
     
     if not target_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -189,10 +169,10 @@ async def add_workspace_member(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not in same tenant")
     
     # Check if already a member
-    existing = db.query(WorkspaceMember).filter(
+    existing = await db.scalar(select(WorkspaceMember).where(
         WorkspaceMember.workspace_id == workspace_id,
         WorkspaceMember.user_id == target_user.id
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already a member")
@@ -204,10 +184,11 @@ async def add_workspace_member(
         status=MemberStatus.ACTIVE
     )
     db.add(member)
-    db.commit()
-    db.refresh(member)
+    await db.commit()
+    invalidate_workspace_roles(workspace_id, target_user.id)
+    await db.refresh(member)
     
-    create_audit_log(db, current_user, "workspace.member_added", "workspace_member", member.id)
+    await create_audit_log(db, current_user, "workspace.member_added", "workspace_member", member.id)
     
     return WorkspaceMemberResponse.model_validate(member)
 
@@ -218,16 +199,16 @@ async def update_workspace_member(
     user_id: int,
     request: UpdateMemberRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Updates a member's role or status"""
     
-    check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
+    await check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
     
-    member = db.query(WorkspaceMember).filter(
+    member = await db.scalar(select(WorkspaceMember).where(
         WorkspaceMember.workspace_id == workspace_id,
         WorkspaceMember.user_id == user_id
-    ).first()
+    ))
     
     if not member:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
@@ -237,10 +218,11 @@ async def update_workspace_member(
     if request.status:
         member.status = MemberStatus(request.status)
     
-    db.commit()
-    db.refresh(member)
+    await db.commit()
+    invalidate_workspace_roles(workspace_id, user_id)
+    await db.refresh(member)
     
-    create_audit_log(db, current_user, "workspace.member_updated", "workspace_member", member.id)
+    await create_audit_log(db, current_user, "workspace.member_updated", "workspace_member", member.id)
     
     return WorkspaceMemberResponse.model_validate(member)
 
@@ -250,23 +232,24 @@ async def remove_workspace_member(
     workspace_id: int,
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Removes a user from a workspace"""
     
-    check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
+    await check_workspace_access(workspace_id, current_user, db, [WorkspaceRole.OWNER, WorkspaceRole.ADMIN])
     
-    member = db.query(WorkspaceMember).filter(
+    member = await db.scalar(select(WorkspaceMember).where(
         WorkspaceMember.workspace_id == workspace_id,
         WorkspaceMember.user_id == user_id
-    ).first()
+    ))
     
     if not member:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
     
-    db.delete(member)
-    db.commit()
+    await db.delete(member)
+    await db.commit()
+    invalidate_workspace_roles(workspace_id, user_id)
     
-    create_audit_log(db, current_user, "workspace.member_removed", "workspace_member", user_id)
+    await create_audit_log(db, current_user, "workspace.member_removed", "workspace_member", user_id)
     
     return SuccessResponse()
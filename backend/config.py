@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -8,10 +9,82 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     cors_origins: str = "http://localhost:3000"
+    # Serve operational endpoints like search cache stats; there is no admin
+    # role to restrict them to, so enable them only where the API is private
+    internal_endpoints_enabled: bool = False
     
     # Database Settings
     database_url: str = "postgresql://postgres:postgres@db:5432/digitalassistant"
     
+    # Security Settings
+    secret_key: str = "CHANGE_THIS_TO_SECURE_SECRET_KEY"
+    download_url_ttl_seconds: int = 3600
+    
+    # Storage Settings
+    storage_backend: str = "local"  # "local" or "s3"
+    storage_root: str = "storage"
+    s3_bucket: str = "documents"
+    s3_endpoint_url: Optional[str] = None
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    
+    # Worker Settings
+    worker_processes: int = 2
+    worker_batch_size: int = 10
+    worker_poll_interval_seconds: float = 2.0
+    worker_maintenance_interval_seconds: float = 300.0
+    job_lease_seconds: int = 300
+    job_retry_base_seconds: float = 30.0
+    job_retry_max_seconds: float = 3600.0
+    
+    # Text Extraction Settings
+    chunk_max_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    
+    # Embedding Settings
+    embedding_backend: str = "hashing"
+    embedding_dimension: int = 256
+    vector_index_root: str = "indexes"
+    vector_index_dtype: str = "float32"  # float32 or int8
+    vector_index_nprobe: int = 8
+    vector_index_sync_seconds: float = 5.0
+    
+    # Summarization Settings
+    summarizer_backend: str = "extractive"
+    summary_sentences: int = 5
+    summary_map_batch_chunks: int = 16
+    summary_reduce_fan_in: int = 8
+    summary_max_concurrency: int = 4
+    
+    # Password Hashing Settings (hashes beyond concurrency + queue are refused with 429)
+    password_hash_rounds: int = 12
+    password_hash_max_concurrency: int = 2
+    password_hash_max_queue: int = 32
+    
+    # Token Revocation Settings (each worker keeps a Bloom filter of revoked token ids)
+    token_denylist_capacity: int = 100000
+    token_denylist_error_rate: float = 0.001
+    token_denylist_sync_seconds: float = 5.0
+    
+    # Authorization Cache Settings (a TTL of 0 disables a cache)
+    principal_cache_max_entries: int = 10000
+    principal_cache_ttl_seconds: float = 15.0
+    workspace_role_cache_max_entries: int = 100000
+    workspace_role_cache_ttl_seconds: float = 15.0
+    auth_invalidation_backend: str = "none"  # none or redis
+    
+    # Search Cache Settings
+    search_cache_backend: str = "memory"  # memory, redis or none
+    search_cache_max_entries: int = 10000
+    search_cache_ttl_seconds: float = 300.0
+    redis_url: str = "redis://localhost:6379/0"
+    
+    # Event Stream Settings
+    event_backend: str = "auto"  # auto, postgres or memory
+    event_keepalive_seconds: float = 15.0
+    event_queue_size: int = 1000
+    
     # Environment
     environment: str = "development"
     debug: bool = True
@@ -1,15 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import os
+from config import settings
 from database import init_db
+from services.token_revocation import get_token_denylist
 from api import (
     auth_router,
     users_router,
     workspaces_router,
     documents_router,
+    uploads_router,
     jobs_router,
+    events_router,
     search_router,
+    search_internal_router,
     summaries_router,
     audit_logs_router,
 )
@@ -33,6 +39,8 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    # Load the token denylist before serving, so no request waits on it
+    await run_in_threadpool(get_token_denylist)
 
 
 class HealthResponse(BaseModel):
@@ -60,7 +68,11 @@ app.include_router(auth_router, prefix="/api/v1")
 app.include_router(users_router, prefix="/api/v1")
 app.include_router(workspaces_router, prefix="/api/v1")
 app.include_router(documents_router, prefix="/api/v1")
+app.include_router(uploads_router, prefix="/api/v1")
 app.include_router(jobs_router, prefix="/api/v1")
+app.include_router(events_router, prefix="/api/v1")
 app.include_router(search_router, prefix="/api/v1")
 app.include_router(summaries_router, prefix="/api/v1")
 app.include_router(audit_logs_router, prefix="/api/v1")
+if settings.internal_endpoints_enabled:
+    app.include_router(search_internal_router, prefix="/api/v1")
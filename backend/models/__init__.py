@@ -1,16 +1,27 @@
 from .user import User
 from .tenant import Tenant
 from .workspace import Workspace, WorkspaceMember
+from .blob import Blob
+from .chunk import Chunk
+from .summary import Summary
 from .document import Document
 from .job import Job
+from .upload_session import UploadSession, UploadPart
 from .audit_log import AuditLog
+from .revoked_token import RevokedToken
 
 __all__ = [
     "User",
     "Tenant",
     "Workspace",
     "WorkspaceMember",
+    "Blob",
+    "Chunk",
+    "Summary",
     "Document",
     "Job",
+    "UploadSession",
+    "UploadPart",
     "AuditLog",
+    "RevokedToken",
 ]
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Text, LargeBinary, UniqueConstraint, DDL, event
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func
+from database import Base
+
+
+class Chunk(Base):
+    __tablename__ = "chunks"
+    __table_args__ = (
+        UniqueConstraint("blob_id", "chunk_index", name="uq_chunk_blob_index"),
+    )
+
+    # Chunks belong to the stored content, so documents sharing a blob share its chunks
+    id = Column(Integer, primary_key=True, index=True)
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    page_number = Column(Integer, nullable=True)
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    # float32 vector from the configured embedder; only loaded when asked for
+    embedding = deferred(Column(LargeBinary, nullable=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Full-text search vector and its GIN index only exist on Postgres; other
+# databases fall back to scanning chunk text (see services.search)
+event.listen(
+    Chunk.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE chunks ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', text)) STORED; "
+        "CREATE INDEX ix_chunks_search_vector ON chunks USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql")
+)
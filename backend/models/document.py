@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, BigInteger
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, BigInteger, Index
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -13,6 +13,23 @@ class DocumentStatus(str, enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) within a workspace
+        Index("ix_documents_workspace_created_id", "workspace_id", "created_at", "id"),
+        # Search joins a workspace's documents to the chunks of their blobs
+        Index("ix_documents_workspace_blob", "workspace_id", "blob_id"),
+        # Search filters narrow a workspace's documents by these before ranking;
+        # created_at ranges use ix_documents_workspace_created_id
+        Index("ix_documents_workspace_mime_type", "workspace_id", "mime_type"),
+        Index("ix_documents_workspace_uploaded_by", "workspace_id", "uploaded_by"),
+        Index("ix_documents_workspace_status", "workspace_id", "status"),
+        Index(
+            "ix_documents_workspace_filename",
+            "workspace_id",
+            "filename",
+            postgresql_ops={"filename": "text_pattern_ops"}
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     workspace_id = Column(Integer, ForeignKey("workspaces.id"), nullable=False, index=True)
@@ -21,6 +38,8 @@ class Document(Base):
     mime_type = Column(String, nullable=False)
     size_bytes = Column(BigInteger, nullable=False)
     storage_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=True, index=True)
     status = Column(Enum(DocumentStatus), nullable=False, default=DocumentStatus.PENDING)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
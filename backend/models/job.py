@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -15,10 +15,16 @@ class JobStatus(str, enum.Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    DEAD_LETTER = "dead_letter"
 
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers only scan jobs that are due: pending jobs, failed jobs whose
+        # retry delay has passed and running jobs whose lease has expired
+        Index("ix_jobs_status_next_run", "status", "next_run_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
@@ -26,5 +32,9 @@ class Job(Base):
     status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
     attempts = Column(Integer, nullable=False, default=0)
     error_message = Column(Text, nullable=True)
+    worker_id = Column(String, nullable=True)
+    # While running, the lease deadline; after a failure, when to retry
+    next_run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy.sql import func
+from database import Base
+
+
+class Summary(Base):
+    __tablename__ = "summaries"
+
+    # Generated summaries are cached per stored content, so documents sharing a
+    # blob share them; cache_key hashes (content hash, chunk ids, instructions,
+    # model version) and the blob's summaries go away with it
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False)
+    # JSON list of sorted chunk ids, or null for the whole document
+    chunk_ids = Column(Text, nullable=True)
+    instructions = Column(Text, nullable=False, default="")
+    model_version = Column(String, nullable=False)
+    summary_text = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
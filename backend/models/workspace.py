@@ -22,6 +22,8 @@ class Workspace(Base):
     name = Column(String, nullable=False)
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Bumped whenever search results in the workspace may change; see services.generations
+    search_generation = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
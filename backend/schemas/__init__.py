@@ -2,6 +2,7 @@ from .auth import *
 from .workspace import *
 from .document import *
 from .job import *
+from .upload import *
 from .search import *
 from .summary import *
 from .audit_log import *
@@ -9,6 +10,8 @@ from .audit_log import *
 __all__ = [
     "RegisterRequest",
     "LoginRequest",
+    "RefreshRequest",
+    "LogoutRequest",
     "TokenResponse",
     "UserResponse",
     "TenantResponse",
@@ -28,11 +31,22 @@ __all__ = [
     "DocumentListResponse",
     "UpdateDocumentRequest",
     "DownloadResponse",
+    "BulkUploadResult",
+    "BulkUploadResponse",
+    "CreateUploadSessionRequest",
+    "UploadPartResponse",
+    "UploadSessionResponse",
     "JobResponse",
     "JobListResponse",
+    "DateRange",
+    "SearchFilters",
     "SearchRequest",
     "SearchResultItem",
     "SearchResponse",
+    "BatchSearchQuery",
+    "BatchSearchRequest",
+    "BatchSearchResponse",
+    "SearchCacheStatsResponse",
     "SummaryRequest",
     "SummaryResponse",
     "ErrorResponse",
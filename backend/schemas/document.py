@@ -10,6 +10,7 @@ class DocumentResponse(BaseModel):
     filename: str
     mime_type: str
     size_bytes: int
+    content_hash: Optional[str] = None
     status: str
     created_at: datetime
 
@@ -29,3 +30,13 @@ class UpdateDocumentRequest(BaseModel):
 class DownloadResponse(BaseModel):
     url: str
     expires_at: datetime
+
+
+class BulkUploadResult(BaseModel):
+    filename: str
+    document: Optional[DocumentResponse] = None
+    error: Optional[str] = None
+
+
+class BulkUploadResponse(BaseModel):
+    items: List[BulkUploadResult]
@@ -9,6 +9,7 @@ class JobResponse(BaseModel):
     status: str
     attempts: int
     error_message: Optional[str] = None
+    next_run_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -1,13 +1,37 @@
-from pydantic import BaseModel
-from typing import Optional, List, Any
+from pydantic import BaseModel, Field
+from typing import Optional, List, Any, Dict, Literal
 from datetime import datetime
 
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+
+
+class DateRange(BaseModel):
+    gte: Optional[datetime] = None
+    lt: Optional[datetime] = None
+
+    class Config:
+        extra = "forbid"
+
+
+# Restricts a search by document metadata; list fields match any of their values
+class SearchFilters(BaseModel):
+    mime_type: Optional[List[str]] = None
+    uploaded_by: Optional[List[int]] = None
+    created_at: Optional[DateRange] = None
+    filename_prefix: Optional[str] = None
+    status: Optional[List[Literal["pending", "processing", "ready", "failed"]]] = None
+
+    class Config:
+        extra = "forbid"
+
 
 class SearchRequest(BaseModel):
     workspace_id: int
     query: str
-    filters: Optional[dict] = None
-    limit: Optional[int] = 10
+    filters: Optional[SearchFilters] = None
+    limit: int = Field(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT)
+    mode: Literal["keyword", "semantic", "hybrid"] = "keyword"
 
 
 class SearchResultItem(BaseModel):
@@ -21,4 +45,35 @@ class SearchResultItem(BaseModel):
 
 class SearchResponse(BaseModel):
     query: str
+    mode: str
+    cached: bool = False
     items: List[SearchResultItem]
+    # Milliseconds spent per stage, plus the request total
+    timings: Dict[str, float] = {}
+
+
+class BatchSearchQuery(BaseModel):
+    query: str
+    filters: Optional[SearchFilters] = None
+    limit: int = Field(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT)
+    mode: Literal["keyword", "semantic", "hybrid"] = "keyword"
+
+
+class BatchSearchRequest(BaseModel):
+    workspace_id: int
+    queries: List[BatchSearchQuery]
+
+
+class BatchSearchResponse(BaseModel):
+    # One response per query, in request order
+    results: List[SearchResponse]
+    # Milliseconds spent per stage across the whole batch, plus the request total
+    timings: Dict[str, float] = {}
+
+
+class SearchCacheStatsResponse(BaseModel):
+    backend: str
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: Optional[int] = None
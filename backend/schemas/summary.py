@@ -12,6 +12,11 @@ class SummaryRequest(BaseModel):
 class SummaryResponse(BaseModel):
     summary_text: str
     created_at: datetime
+    cached: bool = False
+    model_version: Optional[str] = None
+
+    class Config:
+        protected_namespaces = ()
 
 
 class ErrorDetail(BaseModel):
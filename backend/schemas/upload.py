@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+
+class CreateUploadSessionRequest(BaseModel):
+    filename: str
+    mime_type: str
+
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size_bytes: int
+    sha256: str
+
+    class Config:
+        from_attributes = True
+
+
+class UploadSessionResponse(BaseModel):
+    id: int
+    workspace_id: int
+    filename: str
+    mime_type: str
+    status: str
+    parts: List[UploadPartResponse]
+    document_id: Optional[int] = None
+    expires_at: datetime
+    created_at: datetime
@@ -0,0 +1,172 @@
+from .storage import (
+    UploadDigest,
+    StorageBackend,
+    LocalStorageBackend,
+    S3StorageBackend,
+    get_storage,
+    digest_upload,
+    digest_objects,
+    write_upload,
+    write_stream,
+)
+from .blobs import (
+    blob_key,
+    register_blob,
+    acquire_blob,
+    acquire_blobs,
+    acquire_blob_from_parts,
+    release_blob,
+    inherited_status,
+    inherited_statuses,
+)
+from .jobs import enqueue_processing_jobs, enqueue_processing_jobs_bulk, advance_pipeline, set_pipeline_status, detach_jobs
+from .documents import register_document, register_documents
+from .uploads import purge_expired_upload_sessions
+from .signing import sign_token, verify_token
+from .downloads import create_download_url, read_download_token, build_download_response
+from .pagination import encode_cursor, decode_cursor
+from .events import publish_event, publish_document_events, publish_job_events, stream_events
+from .queue import PermanentJobError, job_handler, claim_jobs, extend_leases, complete_job, fail_job, execute_job, retry_job
+from .extraction import TextChunk, chunk_segments, extract_document_text
+from .embeddings import Embedder, HashingEmbedder, get_embedder
+from .vector_index import VectorIndex, get_vector_index, sync_vector_index, embed_document_chunks
+from .search import (
+    SearchHit,
+    keyword_search,
+    semantic_search,
+    keyword_search_batch,
+    semantic_search_batch,
+    reciprocal_rank_fusion,
+    run_search,
+    run_search_batch,
+)
+from .generations import search_generation, bump_search_generation, bump_content_search_generation
+from .invalidations import publish_invalidation, listen_for_invalidations
+from .password_hashing import HashingSaturated, BoundedHashExecutor, get_hash_executor
+from .token_revocation import (
+    BloomFilter,
+    TokenDenylist,
+    get_token_denylist,
+    is_token_revoked,
+    revoke_token,
+    broadcast_revocation,
+    purge_expired_revocations,
+)
+from .principals import PrincipalCache, get_principal_cache, invalidate_principal
+from .workspace_roles import WorkspaceRoleCache, get_workspace_role_cache, invalidate_workspace_roles
+from .summarizer import Summarizer, ExtractiveSummarizer, get_summarizer
+from .summaries import (
+    SummaryError,
+    SingleFlight,
+    summary_cache_key,
+    map_reduce_summary,
+    generate_summary,
+    get_or_create_summary,
+    get_or_create_document_summary,
+    stream_summary,
+    summarize_document,
+)
+from .search_cache import SearchCache, MemorySearchCache, RedisSearchCache, get_search_cache, search_cache_key
+
+__all__ = [
+    "UploadDigest",
+    "StorageBackend",
+    "LocalStorageBackend",
+    "S3StorageBackend",
+    "get_storage",
+    "digest_upload",
+    "digest_objects",
+    "write_upload",
+    "write_stream",
+    "blob_key",
+    "register_blob",
+    "acquire_blob",
+    "acquire_blobs",
+    "acquire_blob_from_parts",
+    "release_blob",
+    "inherited_status",
+    "inherited_statuses",
+    "enqueue_processing_jobs",
+    "enqueue_processing_jobs_bulk",
+    "advance_pipeline",
+    "set_pipeline_status",
+    "detach_jobs",
+    "register_document",
+    "register_documents",
+    "purge_expired_upload_sessions",
+    "sign_token",
+    "verify_token",
+    "create_download_url",
+    "read_download_token",
+    "build_download_response",
+    "encode_cursor",
+    "decode_cursor",
+    "publish_event",
+    "publish_document_events",
+    "publish_job_events",
+    "stream_events",
+    "PermanentJobError",
+    "job_handler",
+    "claim_jobs",
+    "extend_leases",
+    "complete_job",
+    "fail_job",
+    "execute_job",
+    "retry_job",
+    "TextChunk",
+    "chunk_segments",
+    "extract_document_text",
+    "Embedder",
+    "HashingEmbedder",
+    "get_embedder",
+    "VectorIndex",
+    "get_vector_index",
+    "sync_vector_index",
+    "embed_document_chunks",
+    "SearchHit",
+    "keyword_search",
+    "semantic_search",
+    "reciprocal_rank_fusion",
+    "run_search",
+    "keyword_search_batch",
+    "semantic_search_batch",
+    "run_search_batch",
+    "search_generation",
+    "bump_search_generation",
+    "bump_content_search_generation",
+    "SearchCache",
+    "MemorySearchCache",
+    "RedisSearchCache",
+    "get_search_cache",
+    "search_cache_key",
+    "publish_invalidation",
+    "listen_for_invalidations",
+    "HashingSaturated",
+    "BoundedHashExecutor",
+    "get_hash_executor",
+    "BloomFilter",
+    "TokenDenylist",
+    "get_token_denylist",
+    "is_token_revoked",
+    "revoke_token",
+    "broadcast_revocation",
+    "purge_expired_revocations",
+    "PrincipalCache",
+    "get_principal_cache",
+    "invalidate_principal",
+    "WorkspaceRoleCache",
+    "get_workspace_role_cache",
+    "invalidate_workspace_roles",
+    "Summarizer",
+    "ExtractiveSummarizer",
+    "get_summarizer",
+    "SummaryError",
+    "SingleFlight",
+    "summary_cache_key",
+    "map_reduce_summary",
+    "generate_summary",
+    "get_or_create_summary",
+    "get_or_create_document_summary",
+    "stream_summary",
+    "summarize_document",
+]
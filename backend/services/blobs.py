@@ -0,0 +1,168 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from fastapi import UploadFile
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from models.blob import Blob
+from models.chunk import Chunk
+from models.summary import Summary
+from models.document import Document, DocumentStatus
+from services.storage import StorageBackend, UploadDigest, digest_upload, digest_objects, write_upload
+
+
+def blob_key(content_hash: str) -> str:
+    """Storage key of the blob holding content with the given SHA-256"""
+    return f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+
+async def lock_blob(db: AsyncSession, content_hash: str) -> Optional[Blob]:
+    """Fetch a blob by content hash, locking its row for a reference count change"""
+    return await db.scalar(select(Blob).where(Blob.content_hash == content_hash).with_for_update())
+
+
+async def register_blob(
+    db: AsyncSession,
+    digest: UploadDigest,
+    write: Callable[[str], Awaitable[None]]
+) -> Tuple[Blob, bool]:
+    """Take a reference to the blob for a digest, calling write(key) only for unknown content.
+    
+    Returns the blob and whether its bytes were newly written.
+    """
+    blob = await lock_blob(db, digest.sha256)
+    created = False
+    if blob is None:
+        key = blob_key(digest.sha256)
+        await write(key)
+        try:
+            async with db.begin_nested():
+                blob = Blob(content_hash=digest.sha256, storage_path=key, size_bytes=digest.size_bytes, ref_count=0)
+                db.add(blob)
+            created = True
+        except IntegrityError:
+            # A concurrent upload of the same bytes registered the blob first
+            blob = await lock_blob(db, digest.sha256)
+    
+    blob.ref_count += 1
+    await db.flush()
+    return blob, created
+
+
+async def acquire_blobs(
+    db: AsyncSession,
+    storage: StorageBackend,
+    uploads: List[Tuple[UploadFile, UploadDigest]]
+) -> List[Union[Tuple[Blob, bool], Exception]]:
+    """Batch version of acquire_blob for uploads that have already been digested.
+    
+    Looks up all known content in one query, writes each unknown content hash
+    once and inserts the new blob rows together. Returns (blob, created) per
+    upload, in order, or the exception raised while storing that upload.
+    """
+    hashes = {digest.sha256 for _, digest in uploads}
+    blobs = {
+        blob.content_hash: blob
+        for blob in await db.scalars(select(Blob).where(Blob.content_hash.in_(hashes)).with_for_update())
+    }
+    
+    new_blobs = {}
+    failures = {}
+    for file, digest in uploads:
+        if digest.sha256 in blobs or digest.sha256 in new_blobs or digest.sha256 in failures:
+            continue
+        key = blob_key(digest.sha256)
+        try:
+            await write_upload(file, storage, key)
+        except Exception as e:
+            failures[digest.sha256] = e
+            continue
+        new_blobs[digest.sha256] = Blob(content_hash=digest.sha256, storage_path=key, size_bytes=digest.size_bytes, ref_count=0)
+    
+    try:
+        async with db.begin_nested():
+            db.add_all(new_blobs.values())
+    except IntegrityError:
+        # A concurrent upload registered some of this content first; adopt those rows
+        for sha256, blob in list(new_blobs.items()):
+            existing = await lock_blob(db, sha256)
+            if existing is not None:
+                blobs[sha256] = existing
+                del new_blobs[sha256]
+            else:
+                async with db.begin_nested():
+                    db.add(blob)
+    
+    results = []
+    for _, digest in uploads:
+        if digest.sha256 in failures:
+            results.append(failures[digest.sha256])
+            continue
+        blob = blobs.get(digest.sha256)
+        created = False
+        if blob is None:
+            # Only the first upload of new content counts as having created it
+            blob = new_blobs[digest.sha256]
+            created = True
+            blobs[digest.sha256] = blob
+        blob.ref_count += 1
+        results.append((blob, created))
+    await db.flush()
+    return results
+
+
+async def acquire_blob(db: AsyncSession, storage: StorageBackend, file: UploadFile, max_size: int) -> Tuple[Blob, bool]:
+    """Store an upload by content hash and take a reference to its blob"""
+    digest = await digest_upload(file, max_size)
+    return await register_blob(db, digest, lambda key: write_upload(file, storage, key))
+
+
+async def acquire_blob_from_parts(db: AsyncSession, storage: StorageBackend, part_keys: List[str]) -> Tuple[Blob, bool]:
+    """Assemble stored upload parts into a blob and take a reference to it"""
+    digest = await run_in_threadpool(digest_objects, storage, part_keys)
+    return await register_blob(db, digest, lambda key: run_in_threadpool(storage.compose, part_keys, key))
+
+
+async def release_blob(db: AsyncSession, storage: StorageBackend, blob_id: int) -> None:
+    """Drop one reference to a blob, deleting its bytes with the last reference.
+    
+    The object is deleted while the blob row is still locked so a concurrent
+    upload of the same content cannot pick up a blob that is going away.
+    """
+    blob = await db.scalar(select(Blob).where(Blob.id == blob_id).with_for_update())
+    if not blob:
+        return
+    
+    blob.ref_count -= 1
+    if blob.ref_count <= 0:
+        await run_in_threadpool(storage.delete, blob.storage_path)
+        await db.execute(delete(Chunk).where(Chunk.blob_id == blob.id), execution_options={"synchronize_session": False})
+        await db.execute(delete(Summary).where(Summary.blob_id == blob.id), execution_options={"synchronize_session": False})
+        await db.delete(blob)
+    await db.flush()
+
+
+def inherited_statuses(db: Session, blob_ids: List[int]) -> Dict[int, DocumentStatus]:
+    """Reusable processing status per blob, taken from existing documents sharing it"""
+    if not blob_ids:
+        return {}
+    
+    rows = db.query(Document.blob_id, Document.status).filter(
+        Document.blob_id.in_(blob_ids),
+        Document.status != DocumentStatus.FAILED
+    ).distinct().all()
+    
+    # The most advanced status wins: READY over PROCESSING over PENDING
+    ranking = [DocumentStatus.PENDING, DocumentStatus.PROCESSING, DocumentStatus.READY]
+    statuses = {}
+    for row in rows:
+        current = statuses.get(row.blob_id)
+        if current is None or ranking.index(row.status) > ranking.index(current):
+            statuses[row.blob_id] = row.status
+    return statuses
+
+
+def inherited_status(db: Session, blob: Blob) -> Optional[DocumentStatus]:
+    """Processing status of an existing document sharing the blob, if it can be reused"""
+    return inherited_statuses(db, [blob.id]).get(blob.id)
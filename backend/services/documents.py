@@ -0,0 +1,67 @@
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+from models.blob import Blob
+from models.document import Document, DocumentStatus
+from models.user import User
+from services.blobs import inherited_statuses
+from services.jobs import enqueue_processing_jobs_bulk
+from services.events import publish_document_events
+from services.generations import bump_search_generation
+
+
+def register_documents(
+    db: Session,
+    workspace_id: int,
+    user: User,
+    entries: List[Tuple[str, str, Blob, bool]]
+) -> List[Document]:
+    """Add document rows for stored blobs in one batch and queue processing where needed.
+    
+    Each entry is (filename, mime_type, blob, created).
+    """
+    
+    # Documents sharing already-processed content reuse its processing outputs
+    reused = inherited_statuses(db, [blob.id for _, _, blob, created in entries if not created])
+    
+    documents = []
+    to_process = []
+    for filename, mime_type, blob, created in entries:
+        reused_status = None if created else reused.get(blob.id)
+        document = Document(
+            workspace_id=workspace_id,
+            uploaded_by=user.id,
+            filename=filename,
+            mime_type=mime_type,
+            size_bytes=blob.size_bytes,
+            storage_path=blob.storage_path,
+            content_hash=blob.content_hash,
+            blob_id=blob.id,
+            status=reused_status or DocumentStatus.PENDING
+        )
+        documents.append(document)
+        if reused_status is None:
+            to_process.append(document)
+            # Later copies of the same new content in this batch reuse this document's processing
+            reused[blob.id] = DocumentStatus.PENDING
+    
+    db.add_all(documents)
+    db.flush()
+    
+    publish_document_events(db, documents)
+    bump_search_generation(db, [workspace_id])
+    enqueue_processing_jobs_bulk(db, to_process)
+    
+    return documents
+
+
+def register_document(
+    db: Session,
+    workspace_id: int,
+    user: User,
+    filename: str,
+    mime_type: str,
+    blob: Blob,
+    created: bool
+) -> Document:
+    """Add a document row for a stored blob and queue its processing if needed"""
+    return register_documents(db, workspace_id, user, [(filename, mime_type, blob, created)])[0]
@@ -0,0 +1,160 @@
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse, Response
+from starlette.types import Receive, Scope, Send
+from config import settings
+from models.document import Document
+from services.signing import sign_token, verify_token
+from services.storage import StorageBackend, UPLOAD_CHUNK_SIZE, content_disposition
+
+DOWNLOAD_TOKEN_PURPOSE = "download"
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def create_download_url(document: Document) -> Tuple[str, datetime]:
+    """Signed URL that authorizes downloading a document until it expires"""
+    expires_at = int(time.time()) + settings.download_url_ttl_seconds
+    token = sign_token(DOWNLOAD_TOKEN_PURPOSE, {
+        "p": document.storage_path,
+        "h": document.content_hash,
+        "f": document.filename,
+        "m": document.mime_type,
+    }, expires_at)
+    return f"/api/v1/downloads/{token}", datetime.fromtimestamp(expires_at, timezone.utc)
+
+
+def read_download_token(token: str) -> dict:
+    """Verify a download token without touching the database"""
+    payload = verify_token(DOWNLOAD_TOKEN_PURPOSE, token)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired download link")
+    return payload
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into an inclusive (start, end) pair.
+    
+    Returns None when the header should be ignored (multiple or malformed
+    ranges) and raises RangeNotSatisfiable when no requested byte exists.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+            if start >= size:
+                raise RangeNotSatisfiable()
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiable()
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+    
+    if size == 0:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    """Serves a byte range of a local file, via zero-copy sendfile when the server supports it"""
+    
+    def __init__(self, path: str, offset: int, count: int, status_code: int, headers: dict, media_type: str):
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**headers, "content-length": str(count)})
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        with open(self.path, "rb") as fp:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({"type": ZEROCOPY_EXTENSION, "file": fp, "offset": self.offset, "count": self.count})
+                return
+            
+            # Servers without the zero-copy extension get positioned reads, one chunk in memory at a time
+            offset = self.offset
+            remaining = self.count
+            while remaining > 0:
+                chunk = await run_in_threadpool(os.pread, fp.fileno(), min(UPLOAD_CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+def build_download_response(payload: dict, request: Request, storage: StorageBackend) -> Response:
+    """Serve the object named by a verified download token, honouring conditional and range headers"""
+    filename, mime_type = payload["f"], payload["m"]
+    
+    path = storage.local_path(payload["p"])
+    if path is None:
+        expires_in = max(int(payload["exp"] - time.time()), 1)
+        url = storage.presigned_url(payload["p"], filename, mime_type, expires_in)
+        if url is None:
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Storage backend cannot serve downloads")
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document content not found")
+    
+    etag = f"\"{payload['h']}\"" if payload.get("h") else None
+    headers = {
+        "accept-ranges": "bytes",
+        "content-disposition": content_disposition(filename),
+        "cache-control": f"private, max-age={max(int(payload['exp'] - time.time()), 0)}",
+    }
+    if etag:
+        headers["etag"] = etag
+    
+    if etag and request.headers.get("if-none-match") in (etag, "*"):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range validator means the client's partial copy is outdated, so send everything
+    if range_header and (if_range is None or (etag is not None and if_range == etag)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "content-range": f"bytes */{size}"}
+            )
+    
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size, status.HTTP_200_OK, headers, mime_type)
+    
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(path, start, end - start + 1, status.HTTP_206_PARTIAL_CONTENT, headers, mime_type)
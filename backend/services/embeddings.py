@@ -0,0 +1,69 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List
+import numpy as np
+from config import settings
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class Embedder(ABC):
+    """Turns text into unit-length float32 vectors"""
+    
+    model_name: str
+    dimension: int
+    
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as a (len(texts), dimension) float32 matrix of unit rows"""
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic local embedder: signed feature hashing of words and word pairs.
+    
+    Needs no model download and gives the same vectors in every process, at
+    the cost of only capturing lexical overlap.
+    """
+    
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.model_name = f"hashing-{dimension}"
+    
+    def _feature(self, feature: str):
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if value >> 63 else -1.0
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD_PATTERN.findall(text.lower())
+            for word in words:
+                column, sign = self._feature(word)
+                vectors[row, column] += sign
+            for first, second in zip(words, words[1:]):
+                column, sign = self._feature(f"{first} {second}")
+                vectors[row, column] += 0.5 * sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+@lru_cache
+def get_embedder() -> Embedder:
+    """Embedding model configured for this deployment"""
+    if settings.embedding_backend == "hashing":
+        return HashingEmbedder(settings.embedding_dimension)
+    raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
+
+
+def encode_embedding(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def decode_embeddings(values: List[bytes], dimension: int) -> np.ndarray:
+    """Stack stored embeddings into a float32 matrix"""
+    if not values:
+        return np.zeros((0, dimension), dtype=np.float32)
+    return np.frombuffer(b"".join(values), dtype="<f4").reshape(len(values), dimension)
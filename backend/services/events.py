@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from config import settings
+from database import engine
+from models.document import Document
+from models.job import Job
+
+logger = logging.getLogger(__name__)
+
+EVENT_CHANNEL = "workspace_events"
+PENDING_EVENTS_KEY = "pending_events"
+
+
+def event_backend() -> str:
+    """Postgres delivers events across processes via LISTEN/NOTIFY; otherwise only within this process"""
+    if settings.event_backend != "auto":
+        return settings.event_backend
+    return "postgres" if engine.dialect.name == "postgresql" else "memory"
+
+
+def publish_event(db: Session, workspace_id: int, event_type: str, data: Dict[str, Any]) -> None:
+    """Queue an event for a workspace's subscribers, delivered only if the transaction commits"""
+    db.info.setdefault(PENDING_EVENTS_KEY, []).append({
+        "workspace_id": workspace_id,
+        "event": event_type,
+        "data": data,
+    })
+
+
+def publish_document_events(db: Session, documents: List[Document]) -> None:
+    """Publish the current status of documents"""
+    for document in documents:
+        publish_event(db, document.workspace_id, "document", {
+            "id": document.id,
+            "status": document.status.value,
+        })
+
+
+def publish_job_events(db: Session, jobs: List[Job], workspace_ids: Optional[Dict[int, int]] = None) -> None:
+    """Publish the current status of jobs to their documents' workspaces"""
+    if not jobs:
+        return
+    
+    if workspace_ids is None:
+        workspace_ids = dict(db.query(Document.id, Document.workspace_id).filter(
+            Document.id.in_({job.document_id for job in jobs})
+        ).all())
+    for job in jobs:
+        publish_event(db, workspace_ids[job.document_id], "job", {
+            "id": job.id,
+            "document_id": job.document_id,
+            "job_type": job.job_type.value,
+            "status": job.status.value,
+            "attempts": job.attempts,
+        })
+
+
+@event.listens_for(Session, "before_commit")
+def notify_pending_events(session: Session) -> None:
+    # NOTIFY is transactional: listeners receive it only once the commit succeeds
+    if event_backend() != "postgres":
+        return
+    for message in session.info.pop(PENDING_EVENTS_KEY, []):
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": EVENT_CHANNEL, "payload": json.dumps(message)}
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def broadcast_pending_events(session: Session) -> None:
+    messages = session.info.pop(PENDING_EVENTS_KEY, [])
+    if messages:
+        broker.dispatch_threadsafe(messages)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def discard_pending_events(session: Session, transaction) -> None:
+    # Events queued by a transaction that rolled back never happened
+    if transaction.parent is None:
+        session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+class EventBroker:
+    """Fans events out to the workspace subscribers connected to this process"""
+    
+    def __init__(self):
+        self.subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.listener: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+    
+    def subscribe(self, workspace_id: int) -> asyncio.Queue:
+        self.loop = asyncio.get_running_loop()
+        if event_backend() == "postgres":
+            self.start_listener()
+        
+        queue = asyncio.Queue(maxsize=settings.event_queue_size)
+        self.subscribers[workspace_id].add(queue)
+        return queue
+    
+    def unsubscribe(self, workspace_id: int, queue: asyncio.Queue) -> None:
+        queues = self.subscribers.get(workspace_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[workspace_id]
+    
+    def dispatch(self, messages: List[Dict[str, Any]]) -> None:
+        """Deliver messages to local subscribers; must run on the event loop"""
+        for message in messages:
+            for queue in list(self.subscribers.get(message["workspace_id"], ())):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    # A subscriber that cannot keep up gets told to refetch instead
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"workspace_id": message["workspace_id"], "event": "resync", "data": {}})
+    
+    def dispatch_threadsafe(self, messages: List[Dict[str, Any]]) -> None:
+        if self.loop is None or self.loop.is_closed() or not self.subscribers:
+            return
+        self.loop.call_soon_threadsafe(self.dispatch, messages)
+    
+    def resync_all(self) -> None:
+        self.dispatch_threadsafe([
+            {"workspace_id": workspace_id, "event": "resync", "data": {}}
+            for workspace_id in list(self.subscribers)
+        ])
+    
+    def start_listener(self) -> None:
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name="event-listener", daemon=True)
+                self.listener.start()
+    
+    def listen(self) -> None:
+        """Relay Postgres notifications to local subscribers, reconnecting on failure"""
+        while True:
+            connection = None
+            try:
+                # A dedicated connection: LISTEN must not go back into the pool
+                connection = engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f"LISTEN {EVENT_CHANNEL}")
+                
+                while True:
+                    if select.select([dbapi_connection], [], [], settings.event_keepalive_seconds) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    messages = []
+                    while dbapi_connection.notifies:
+                        messages.append(json.loads(dbapi_connection.notifies.pop(0).payload))
+                    self.dispatch_threadsafe(messages)
+            except Exception:
+                logger.exception("Event listener connection lost")
+                # Anything sent while disconnected was missed
+                self.resync_all()
+                time.sleep(1)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+broker = EventBroker()
+
+
+def format_event(message: Dict[str, Any]) -> str:
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+async def stream_events(request: Request, workspace_id: int) -> AsyncIterator[str]:
+    """Server-Sent Events for a workspace until the client disconnects"""
+    queue = broker.subscribe(workspace_id)
+    try:
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=settings.event_keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(message)
+    finally:
+        broker.unsubscribe(workspace_id, queue)
@@ -0,0 +1,215 @@
+import codecs
+import re
+import shutil
+import tempfile
+import zipfile
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from config import settings
+from models.blob import Blob
+from models.chunk import Chunk
+from models.document import Document
+from models.job import Job, JobType
+from services.queue import PermanentJobError, job_handler
+from services.storage import UPLOAD_CHUNK_SIZE, StorageBackend, get_storage
+
+TEXT_READ_SIZE = 64 * 1024
+CHUNK_INSERT_BATCH_SIZE = 500
+
+# Tokens are approximated by runs of non-whitespace
+TOKEN_PATTERN = re.compile(r"\S+")
+TRAILING_WHITESPACE = re.compile(r"\s(?=\S*$)")
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# (page number, text) pieces of a document's extracted text, in order
+Segment = Tuple[Optional[int], str]
+
+
+@dataclass
+class TextChunk:
+    index: int
+    page_number: Optional[int]
+    start_offset: int
+    end_offset: int
+    token_count: int
+    text: str
+
+
+def iter_text_segments(stream: BinaryIO) -> Iterator[Segment]:
+    """Decode a plain text file in blocks that never split a token"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    while True:
+        data = stream.read(TEXT_READ_SIZE)
+        text = pending + decoder.decode(data, final=not data)
+        if not data:
+            if text:
+                yield None, text
+            return
+        
+        # Hold back a trailing partial token until the next block completes it
+        match = TRAILING_WHITESPACE.search(text)
+        if match is None and len(text) < 4 * TEXT_READ_SIZE:
+            pending = text
+            continue
+        split = match.end() if match else len(text)
+        pending = text[split:]
+        yield None, text[:split]
+
+
+def iter_pdf_pages(stream: BinaryIO) -> Iterator[Segment]:
+    """Extract a PDF one page at a time"""
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+    
+    try:
+        reader = PdfReader(stream)
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield page_number, (page.extract_text() or "") + "\n"
+    except PdfReadError as e:
+        raise PermanentJobError(f"Unreadable PDF: {e}")
+
+
+def iter_docx_paragraphs(stream: BinaryIO) -> Iterator[Segment]:
+    """Extract a DOCX one paragraph at a time by streaming its XML body"""
+    try:
+        with zipfile.ZipFile(stream) as archive, archive.open("word/document.xml") as body:
+            page_number = 1
+            paragraph_page = 1
+            parts: List[str] = []
+            for event, element in ElementTree.iterparse(body, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == WORD_NAMESPACE + "p":
+                        paragraph_page = page_number
+                    continue
+                
+                if tag == WORD_NAMESPACE + "t":
+                    parts.append(element.text or "")
+                elif tag == WORD_NAMESPACE + "tab":
+                    parts.append("\t")
+                elif tag == WORD_NAMESPACE + "br":
+                    if element.get(WORD_NAMESPACE + "type") == "page":
+                        page_number += 1
+                    else:
+                        parts.append("\n")
+                elif tag == WORD_NAMESPACE + "lastRenderedPageBreak":
+                    page_number += 1
+                elif tag == WORD_NAMESPACE + "p":
+                    yield paragraph_page, "".join(parts) + "\n"
+                    parts = []
+                    element.clear()
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise PermanentJobError(f"Unreadable DOCX: {e}")
+
+
+EXTRACTORS: Dict[str, Callable[[BinaryIO], Iterator[Segment]]] = {
+    "text/plain": iter_text_segments,
+    "application/pdf": iter_pdf_pages,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": iter_docx_paragraphs,
+}
+
+
+def chunk_segments(segments: Iterable[Segment], max_tokens: int, overlap_tokens: int) -> Iterator[TextChunk]:
+    """Split streamed text into overlapping chunks of at most max_tokens tokens.
+    
+    Offsets index into the concatenated segment text. Only the text of the
+    chunk being built is kept, so memory does not grow with the document.
+    """
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    
+    buffer = ""
+    buffer_start = 0
+    offset = 0
+    window: List[Tuple[int, int, Optional[int]]] = []
+    fresh = 0
+    index = 0
+    
+    def emit() -> TextChunk:
+        start, end = window[0][0], window[-1][1]
+        return TextChunk(
+            index=index,
+            page_number=window[0][2],
+            start_offset=start,
+            end_offset=end,
+            token_count=len(window),
+            text=buffer[start - buffer_start:end - buffer_start]
+        )
+    
+    for page_number, text in segments:
+        buffer += text
+        for match in TOKEN_PATTERN.finditer(text):
+            window.append((offset + match.start(), offset + match.end(), page_number))
+            fresh += 1
+            if len(window) == max_tokens:
+                yield emit()
+                index += 1
+                window = window[len(window) - overlap_tokens:]
+                fresh = 0
+        offset += len(text)
+        
+        # Drop text that no future chunk can include
+        keep_from = window[0][0] if window else offset
+        buffer = buffer[keep_from - buffer_start:]
+        buffer_start = keep_from
+    
+    if fresh:
+        yield emit()
+
+
+@contextmanager
+def open_local_copy(storage: StorageBackend, key: str) -> Iterator[BinaryIO]:
+    """Open stored content as a seekable local file, downloading it first if needed"""
+    path = storage.local_path(key)
+    if path is not None:
+        with open(path, "rb") as f:
+            yield f
+        return
+    
+    with tempfile.TemporaryFile() as f:
+        with closing(storage.open_reader(key)) as reader:
+            shutil.copyfileobj(reader, f, UPLOAD_CHUNK_SIZE)
+        f.seek(0)
+        yield f
+
+
+@job_handler(JobType.TEXT_EXTRACTION)
+def extract_document_text(db: Session, job: Job) -> None:
+    """Extract a document's text into chunks, in batches as it is read"""
+    document = db.query(Document).filter(Document.id == job.document_id).first()
+    if document is None or document.blob_id is None:
+        raise PermanentJobError("Document has no stored content")
+    
+    # Chunks are shared by all documents with this content and never rewritten,
+    # so their ids stay stable once extracted
+    if db.query(Chunk.id).filter(Chunk.blob_id == document.blob_id).first():
+        return
+    
+    extractor = EXTRACTORS.get(document.mime_type)
+    if extractor is None:
+        raise PermanentJobError(f"Text extraction is not supported for {document.mime_type}")
+    
+    blob = db.query(Blob).filter(Blob.id == document.blob_id).first()
+    with open_local_copy(get_storage(), blob.storage_path) as stream:
+        batch = []
+        for chunk in chunk_segments(extractor(stream), settings.chunk_max_tokens, settings.chunk_overlap_tokens):
+            batch.append({
+                "blob_id": blob.id,
+                "chunk_index": chunk.index,
+                "page_number": chunk.page_number,
+                "start_offset": chunk.start_offset,
+                "end_offset": chunk.end_offset,
+                "token_count": chunk.token_count,
+                "text": chunk.text,
+            })
+            if len(batch) >= CHUNK_INSERT_BATCH_SIZE:
+                db.execute(insert(Chunk), batch)
+                batch = []
+        if batch:
+            db.execute(insert(Chunk), batch)
@@ -0,0 +1,31 @@
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.document import Document
+from models.workspace import Workspace
+
+
+def search_generation(db: Session, workspace_id: int) -> int:
+    """Current search generation of a workspace; cached results of older generations are stale"""
+    return db.query(Workspace.search_generation).filter(Workspace.id == workspace_id).scalar() or 0
+
+
+def bump_search_generation(db: Session, workspace_ids: Iterable[int]) -> None:
+    """Invalidate cached search results of workspaces when this transaction commits"""
+    workspace_ids = set(workspace_ids)
+    if not workspace_ids:
+        return
+    
+    db.query(Workspace).filter(Workspace.id.in_(workspace_ids)).update({
+        Workspace.search_generation: Workspace.search_generation + 1,
+        # Not an edit of the workspace itself
+        Workspace.updated_at: Workspace.updated_at,
+    }, synchronize_session=False)
+
+
+def bump_content_search_generation(db: Session, blob_id: Optional[int]) -> None:
+    """Invalidate every workspace holding a document with this content"""
+    if blob_id is not None:
+        bump_search_generation(db, db.scalars(
+            select(Document.workspace_id).where(Document.blob_id == blob_id).distinct()
+        ))
@@ -0,0 +1,70 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def invalidation_channel_enabled() -> bool:
+    if settings.auth_invalidation_backend not in ("none", "redis"):
+        raise ValueError(f"Unknown invalidation backend: {settings.auth_invalidation_backend}")
+    return settings.auth_invalidation_backend == "redis"
+
+
+@lru_cache
+def get_redis_client():
+    """Redis client shared by this process; it pools its connections"""
+    import redis
+    
+    return redis.Redis.from_url(settings.redis_url)
+
+
+@lru_cache
+def get_publish_executor() -> ThreadPoolExecutor:
+    """Single thread that publishes invalidations in order, off the caller's thread"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="invalidations")
+
+
+def send_invalidation(channel: str, message: str) -> None:
+    import redis
+    
+    try:
+        get_redis_client().publish(channel, message)
+    except redis.RedisError:
+        logger.exception("Could not publish invalidation %r on %s", message, channel)
+
+
+def publish_invalidation(channel: str, message: str) -> None:
+    """Tell every worker's listener on the channel to drop cached entries.
+    
+    Returns at once, so async handlers can call it: the message is sent from
+    a background thread, and a slow or unreachable Redis only delays it.
+    """
+    if not invalidation_channel_enabled():
+        return
+    get_publish_executor().submit(send_invalidation, channel, message)
+
+
+def listen_for_invalidations(channel: str, invalidate: Callable[[str], None]) -> None:
+    """Call invalidate(message) in a background thread for each message other workers publish"""
+    if not invalidation_channel_enabled():
+        return
+    
+    def listen() -> None:
+        import redis
+        
+        while True:
+            try:
+                pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                for message in pubsub.listen():
+                    invalidate(message["data"].decode())
+            except Exception:
+                logger.exception("Invalidation listener on %s failed, reconnecting", channel)
+                time.sleep(1)
+    
+    threading.Thread(target=listen, name=channel, daemon=True).start()
@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from models.document import Document, DocumentStatus
+from models.job import Job, JobType, JobStatus
+from services.events import publish_event, publish_job_events
+from services.generations import bump_content_search_generation, bump_search_generation
+
+# Processing pipeline: a job type is queued for a document once every job
+# type it depends on has completed for that document
+JOB_DEPENDENCIES: Dict[JobType, List[JobType]] = {
+    JobType.TEXT_EXTRACTION: [],
+    JobType.EMBEDDING: [JobType.TEXT_EXTRACTION],
+    JobType.SUMMARIZATION: [JobType.EMBEDDING],
+}
+
+ROOT_JOB_TYPES = [job_type for job_type, dependencies in JOB_DEPENDENCIES.items() if not dependencies]
+
+
+def enqueue_processing_jobs_bulk(db: Session, documents: List[Document]) -> List[Job]:
+    """Queue the first pipeline stage for newly stored documents in one batch"""
+    jobs = [
+        Job(document_id=document.id, job_type=job_type, status=JobStatus.PENDING, attempts=0)
+        for document in documents
+        for job_type in ROOT_JOB_TYPES
+    ]
+    db.add_all(jobs)
+    db.flush()
+    publish_job_events(db, jobs, {document.id: document.workspace_id for document in documents})
+    return jobs
+
+
+def enqueue_processing_jobs(db: Session, document: Document) -> List[Job]:
+    """Queue the first pipeline stage for a newly stored document"""
+    return enqueue_processing_jobs_bulk(db, [document])
+
+
+def set_pipeline_status(
+    db: Session,
+    document_ids: Iterable[int],
+    status: DocumentStatus,
+    from_statuses: Optional[List[DocumentStatus]] = None
+) -> None:
+    """Set the status of documents and of every document sharing their content"""
+    document_ids = list(document_ids)
+    if not document_ids:
+        return
+    
+    blob_ids = select(Document.blob_id).where(
+        Document.id.in_(document_ids),
+        Document.blob_id.isnot(None)
+    )
+    query = db.query(Document.id, Document.workspace_id).filter(or_(
+        Document.id.in_(document_ids),
+        Document.blob_id.in_(blob_ids)
+    ))
+    if from_statuses is not None:
+        query = query.filter(Document.status.in_(from_statuses))
+    documents = query.all()
+    if not documents:
+        return
+    
+    db.query(Document).filter(
+        Document.id.in_([document.id for document in documents])
+    ).update({Document.status: status}, synchronize_session=False)
+    for document in documents:
+        publish_event(db, document.workspace_id, "document", {"id": document.id, "status": status.value})
+    bump_search_generation(db, {document.workspace_id for document in documents})
+
+
+def advance_pipeline(db: Session, job: Job) -> List[Job]:
+    """Queue the stages unblocked by a completed job, or mark its document ready.
+    
+    Runs in the transaction that completes the job. The document row is
+    locked so concurrent completions of sibling stages see each other.
+    """
+    document = db.query(Document).filter(Document.id == job.document_id).with_for_update().first()
+    if document is None:
+        return []
+    
+    # The completed stage may have added chunks or embeddings to search
+    bump_content_search_generation(db, document.blob_id)
+    
+    rows = db.query(Job.job_type, Job.status).filter(Job.document_id == document.id).all()
+    existing = {job_type for job_type, _ in rows}
+    completed = {job_type for job_type, job_status in rows if job_status == JobStatus.COMPLETED}
+    completed.add(job.job_type)
+    
+    if completed.issuperset(JOB_DEPENDENCIES.keys()):
+        set_pipeline_status(db, [document.id], DocumentStatus.READY)
+        return []
+    
+    jobs = [
+        Job(document_id=document.id, job_type=job_type, status=JobStatus.PENDING, attempts=0)
+        for job_type, dependencies in JOB_DEPENDENCIES.items()
+        if job.job_type in dependencies and job_type not in existing and completed.issuperset(dependencies)
+    ]
+    db.add_all(jobs)
+    db.flush()
+    publish_job_events(db, jobs, {document.id: document.workspace_id})
+    return jobs
+
+
+def detach_jobs(db: Session, document: Document) -> None:
+    """Hand a document's jobs to another document sharing its blob, or drop them"""
+    query = db.query(Job).filter(Job.document_id == document.id)
+    
+    sibling = None
+    if document.blob_id is not None:
+        sibling = db.query(Document.id).filter(
+            Document.blob_id == document.blob_id,
+            Document.id != document.id
+        ).order_by(Document.id).first()
+    
+    if sibling:
+        query.update({Job.document_id: sibling.id}, synchronize_session=False)
+    else:
+        query.delete(synchronize_session=False)
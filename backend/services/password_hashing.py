@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, TypeVar
+from config import settings
+
+T = TypeVar("T")
+
+
+class HashingSaturated(Exception):
+    """Too many password hashes are already running or queued"""
+
+
+class BoundedHashExecutor:
+    """Thread pool for password hashing that refuses work beyond a fixed queue depth.
+    
+    bcrypt holds a thread for hundreds of milliseconds, so hashing off the
+    event loop keeps other requests responsive, and rejecting the overflow
+    keeps a login storm from queueing unbounded work behind it.
+    """
+    
+    def __init__(self, max_workers: int, max_queue: int):
+        self.capacity = max_workers + max_queue
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+    
+    async def run(self, function: Callable[..., T], *args) -> T:
+        with self.lock:
+            if self.pending >= self.capacity:
+                raise HashingSaturated()
+            self.pending += 1
+        # Count work until it finishes, even if the waiting request goes away
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+    
+    def _finished(self, future) -> None:
+        with self.lock:
+            self.pending -= 1
+
+
+@lru_cache
+def get_hash_executor() -> BoundedHashExecutor:
+    """Password hashing pool for this process"""
+    return BoundedHashExecutor(settings.password_hash_max_concurrency, settings.password_hash_max_queue)
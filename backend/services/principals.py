@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy.orm import make_transient_to_detached
+from config import settings
+from models.user import User
+from services.invalidations import listen_for_invalidations, publish_invalidation
+
+INVALIDATION_CHANNEL = "principal-invalidations"
+
+
+def detached_user(user: User) -> User:
+    """Copy of a user's row that any session can merge back without a query"""
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class PrincipalCache:
+    """Bounded TTL cache of authenticated users by user id and token, private to this process"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Tuple[int, str], Tuple[float, User]]" = OrderedDict()
+        self.keys_by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        self.lock = threading.Lock()
+    
+    def get(self, user_id: int, token: str) -> Optional[User]:
+        key = (user_id, token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+    
+    def set(self, user_id: int, token: str, user: User) -> None:
+        key = (user_id, token)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, detached_user(user))
+            self.entries.move_to_end(key)
+            self.keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+    
+    def invalidate(self, user_id: int) -> None:
+        """Forget every token of a user"""
+        with self.lock:
+            for key in list(self.keys_by_user.get(user_id, ())):
+                self._remove(key)
+    
+    def _remove(self, key: Tuple[int, str]) -> None:
+        del self.entries[key]
+        keys = self.keys_by_user[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self.keys_by_user[key[0]]
+
+
+@lru_cache
+def get_principal_cache() -> Optional[PrincipalCache]:
+    """Principal cache for this process, or None when disabled"""
+    if settings.principal_cache_ttl_seconds <= 0:
+        return None
+    
+    cache = PrincipalCache(settings.principal_cache_max_entries, settings.principal_cache_ttl_seconds)
+    listen_for_invalidations(INVALIDATION_CHANNEL, lambda message: cache.invalidate(int(message)))
+    return cache
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Stop serving a user from the cache, in every worker when a channel is configured.
+    
+    Call after committing the change, so a concurrent request cannot cache
+    the old row again. Without a channel, other workers drop the user once
+    their entries expire.
+    """
+    cache = get_principal_cache()
+    if cache is None:
+        return
+    
+    cache.invalidate(user_id)
+    publish_invalidation(INVALIDATION_CHANNEL, str(user_id))
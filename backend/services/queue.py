@@ -0,0 +1,204 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.document import DocumentStatus
+from models.job import Job, JobType, JobStatus
+from services.jobs import advance_pipeline, set_pipeline_status
+from services.events import publish_job_events
+
+JobHandler = Callable[[Session, Job], None]
+
+# Filled in by the modules implementing each job type via @job_handler
+JOB_HANDLERS: Dict[JobType, JobHandler] = {}
+
+# Attempts before a job is moved to the dead-letter state
+JOB_MAX_ATTEMPTS: Dict[JobType, int] = {
+    JobType.TEXT_EXTRACTION: 3,
+    JobType.EMBEDDING: 5,
+    JobType.SUMMARIZATION: 3,
+}
+
+# Statuses a worker may pick up once next_run_at has passed
+CLAIMABLE_STATUSES = [JobStatus.PENDING, JobStatus.FAILED, JobStatus.RUNNING]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed"""
+
+
+def job_handler(job_type: JobType) -> Callable[[JobHandler], JobHandler]:
+    """Register the function that runs jobs of a given type.
+    
+    Handlers run inside the worker's process pool with their own session.
+    Their writes are committed together with the job's completion, and a job
+    may run again after a crash, so handlers must be idempotent.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return register
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the retry after the given attempt"""
+    delay = min(settings.job_retry_max_seconds, settings.job_retry_base_seconds * 2 ** max(attempts - 1, 0))
+    # Equal jitter: never retry sooner than half the backoff, so a poison
+    # job cannot spin, but spread retries of jobs that failed together
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim_jobs(db: Session, worker_id: str, job_types: Iterable[JobType], limit: int, lease_seconds: int) -> List[int]:
+    """Lease up to limit due jobs to a worker and return their ids.
+    
+    Rows locked by other workers are skipped rather than waited on, so any
+    number of workers can poll the same table concurrently. A running job is
+    due once its lease has expired, meaning its worker crashed; if it has
+    used up its attempts it is dead-lettered instead of run again.
+    """
+    job_types = list(job_types)
+    if not job_types or limit <= 0:
+        return []
+    
+    now = utcnow()
+    jobs = db.query(Job).filter(
+        Job.status.in_(CLAIMABLE_STATUSES),
+        Job.next_run_at <= now,
+        Job.job_type.in_(job_types)
+    ).order_by(Job.next_run_at, Job.id).limit(limit).with_for_update(skip_locked=True).all()
+    
+    job_ids = []
+    started = []
+    for job in jobs:
+        if job.status == JobStatus.RUNNING and job.attempts >= JOB_MAX_ATTEMPTS[job.job_type]:
+            job.status = JobStatus.DEAD_LETTER
+            job.worker_id = None
+            job.error_message = f"Lease expired on attempt {job.attempts}; worker presumed crashed"
+            set_pipeline_status(db, [job.document_id], DocumentStatus.FAILED)
+            continue
+        job.status = JobStatus.RUNNING
+        job.worker_id = worker_id
+        job.next_run_at = now + timedelta(seconds=lease_seconds)
+        job.heartbeat_at = now
+        job.attempts += 1
+        job_ids.append(job.id)
+        started.append(job.document_id)
+    
+    set_pipeline_status(db, started, DocumentStatus.PROCESSING, from_statuses=[DocumentStatus.PENDING])
+    publish_job_events(db, jobs)
+    db.commit()
+    
+    return job_ids
+
+
+def extend_leases(db: Session, worker_id: str, job_ids: List[int], lease_seconds: int) -> int:
+    """Heartbeat: push back the lease of jobs this worker is still running"""
+    if not job_ids:
+        return 0
+    
+    now = utcnow()
+    updated = db.query(Job).filter(
+        Job.id.in_(job_ids),
+        Job.worker_id == worker_id,
+        Job.status == JobStatus.RUNNING
+    ).update({
+        Job.next_run_at: now + timedelta(seconds=lease_seconds),
+        Job.heartbeat_at: now,
+    }, synchronize_session=False)
+    db.commit()
+    
+    return updated
+
+
+def leased_job(db: Session, job_id: int, worker_id: str) -> Optional[Job]:
+    """Lock a job for recording its outcome, if this worker still holds it"""
+    return db.query(Job).filter(
+        Job.id == job_id,
+        Job.worker_id == worker_id,
+        Job.status == JobStatus.RUNNING
+    ).with_for_update().first()
+
+
+def complete_job(db: Session, job_id: int, worker_id: str) -> bool:
+    """Mark a leased job completed and queue the pipeline stages it unblocks.
+    
+    Returns False if the lease was lost to another worker.
+    """
+    job = leased_job(db, job_id, worker_id)
+    if job is None:
+        return False
+    
+    job.status = JobStatus.COMPLETED
+    job.worker_id = None
+    job.error_message = None
+    publish_job_events(db, [job])
+    advance_pipeline(db, job)
+    return True
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str, permanent: bool = False) -> bool:
+    """Schedule a retry with backoff, or dead-letter the job once its attempts are used up"""
+    job = leased_job(db, job_id, worker_id)
+    if job is None:
+        return False
+    
+    job.worker_id = None
+    job.error_message = error
+    if permanent or job.attempts >= JOB_MAX_ATTEMPTS[job.job_type]:
+        job.status = JobStatus.DEAD_LETTER
+        set_pipeline_status(db, [job.document_id], DocumentStatus.FAILED)
+    else:
+        job.status = JobStatus.FAILED
+        job.next_run_at = utcnow() + timedelta(seconds=retry_delay(job.attempts))
+    publish_job_events(db, [job])
+    return True
+
+
+def retry_job(db: Session, job: Job) -> None:
+    """Send a dead-lettered job back to the queue with a fresh set of attempts"""
+    job.status = JobStatus.PENDING
+    job.attempts = 0
+    job.next_run_at = utcnow()
+    set_pipeline_status(db, [job.document_id], DocumentStatus.PROCESSING)
+    publish_job_events(db, [job])
+
+
+def execute_job(job_id: int, worker_id: str) -> bool:
+    """Run a leased job in the current process and record the outcome.
+    
+    Returns True when the job completed. The handler's writes are rolled back
+    if the lease was lost while it ran.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id,
+            Job.status == JobStatus.RUNNING
+        ).first()
+        if job is None:
+            return False
+        
+        handler = JOB_HANDLERS.get(job.job_type)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for {job.job_type.value} jobs")
+            handler(db, job)
+            if not complete_job(db, job_id, worker_id):
+                db.rollback()
+                return False
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            fail_job(db, job_id, worker_id, f"{type(e).__name__}: {e}", permanent=isinstance(e, PermanentJobError))
+            db.commit()
+            return False
+    finally:
+        db.close()
@@ -0,0 +1,480 @@
+import asyncio
+import heapq
+import json
+import math
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Integer, Text, column, func, literal_column, or_, select, true, values
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from database import SessionLocal
+from models.chunk import Chunk
+from models.document import Document, DocumentStatus
+from schemas.search import MAX_SEARCH_LIMIT, SearchFilters
+from services.embeddings import get_embedder
+from services.vector_index import sync_vector_index
+
+MAX_BATCH_QUERIES = 100
+
+# Reciprocal rank fusion damping constant; 60 is the value from the original RRF paper
+RRF_K = 60
+# Each hybrid leg retrieves this many times the requested limit before fusion
+HYBRID_CANDIDATE_FACTOR = 3
+
+# Fallback scoring streams candidate chunks from the database this many at a time
+FALLBACK_FETCH_ROWS = 1000
+SNIPPET_WORDS = 30
+
+WORD_PATTERN = re.compile(r"\w+")
+
+TS_CONFIG = literal_column("'english'")
+TS_HEADLINE_OPTIONS = literal_column("'MaxFragments=1, MinWords=15, MaxWords=35'")
+# Generated column that only exists on PostgreSQL, see models.chunk
+SEARCH_VECTOR = literal_column("chunks.search_vector")
+
+
+@dataclass
+class SearchHit:
+    document_id: int
+    chunk_id: int
+    score: float
+    snippet: str
+    filename: str
+    created_at: datetime
+
+
+def document_filter_clauses(filters: Optional[SearchFilters]) -> list:
+    """WHERE clauses on Document restricting a search to the filtered documents.
+    
+    Every search leg adds these to the query that generates its candidates,
+    so a selective filter shrinks the work instead of the result.
+    """
+    if filters is None:
+        return []
+    
+    clauses = []
+    if filters.mime_type is not None:
+        clauses.append(Document.mime_type.in_(filters.mime_type))
+    if filters.uploaded_by is not None:
+        clauses.append(Document.uploaded_by.in_(filters.uploaded_by))
+    if filters.created_at is not None:
+        if filters.created_at.gte is not None:
+            clauses.append(Document.created_at >= filters.created_at.gte)
+        if filters.created_at.lt is not None:
+            clauses.append(Document.created_at < filters.created_at.lt)
+    if filters.filename_prefix:
+        clauses.append(Document.filename.like(f"{escape_like(filters.filename_prefix)}%", escape="\\"))
+    if filters.status is not None:
+        clauses.append(Document.status.in_([DocumentStatus(value) for value in filters.status]))
+    return clauses
+
+
+def keyword_search(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[SearchHit]:
+    """Full-text search over a workspace's chunks, best matches first"""
+    if not query.strip() or limit <= 0:
+        return []
+    
+    if db.get_bind().dialect.name == "postgresql":
+        return postgres_keyword_search(db, workspace_id, query, limit, filters)
+    return python_keyword_search(db, workspace_id, query, limit, filters)
+
+
+def postgres_keyword_search(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[SearchHit]:
+    """Rank with ts_rank_cd over the GIN-indexed search vector"""
+    return postgres_keyword_search_batch(db, workspace_id, [query], limit, filters)[0]
+
+
+def postgres_keyword_search_batch(
+    db: Session,
+    workspace_id: int,
+    queries: List[str],
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[List[SearchHit]]:
+    """Rank several queries in one statement: a VALUES list of queries, each joined laterally to its top hits.
+    
+    Each query gets its own LIMIT, so a query matching many chunks cannot
+    crowd out the others. Headlines are only generated for the rows that
+    make a limit, since ts_headline re-parses the chunk text.
+    """
+    results: List[List[SearchHit]] = [[] for _ in queries]
+    positions = [position for position, query in enumerate(queries) if query.strip()]
+    if not positions or limit <= 0:
+        return results
+    
+    batch = values(
+        column("query_index", Integer), column("query", Text), name="queries"
+    ).data([(position, queries[position]) for position in positions])
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, batch.c.query)
+    score = func.ts_rank_cd(SEARCH_VECTOR, tsquery).label("score")
+    hits = select(
+        Document.id.label("document_id"),
+        Chunk.id.label("chunk_id"),
+        Document.filename,
+        Document.created_at,
+        score
+    ).join(Chunk, Chunk.blob_id == Document.blob_id).where(
+        Document.workspace_id == workspace_id,
+        SEARCH_VECTOR.op("@@")(tsquery),
+        *document_filter_clauses(filters)
+    ).order_by(score.desc(), Chunk.id).limit(limit).lateral("hits")
+    
+    headline_chunk = aliased(Chunk)
+    rows = db.execute(
+        select(
+            batch.c.query_index,
+            hits,
+            func.ts_headline(TS_CONFIG, headline_chunk.text, tsquery, TS_HEADLINE_OPTIONS).label("snippet")
+        ).select_from(batch).join(hits, true()).join(
+            headline_chunk, headline_chunk.id == hits.c.chunk_id
+        ).order_by(batch.c.query_index, hits.c.score.desc(), hits.c.chunk_id)
+    ).all()
+    for row in rows:
+        results[row.query_index].append(SearchHit(
+            document_id=row.document_id,
+            chunk_id=row.chunk_id,
+            score=row.score,
+            snippet=row.snippet,
+            filename=row.filename,
+            created_at=row.created_at
+        ))
+    return results
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def highlight(chunk_text: str, terms: set) -> str:
+    """Snippet around the first matching word, with matches in <b> tags like ts_headline"""
+    words = chunk_text.split()
+    normalized = [word.lower() for word in words]
+    first = next(
+        (i for i, word in enumerate(normalized) if terms.intersection(WORD_PATTERN.findall(word))),
+        0
+    )
+    start = max(0, first - SNIPPET_WORDS // 3)
+    return " ".join(
+        f"<b>{word}</b>" if terms.intersection(WORD_PATTERN.findall(normalized[i])) else word
+        for i, word in enumerate(words[start:start + SNIPPET_WORDS], start)
+    )
+
+
+def python_keyword_search(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[SearchHit]:
+    """Portable fallback: filter candidates with LIKE, then score term frequency in Python"""
+    return python_keyword_search_batch(db, workspace_id, [query], limit, filters)[0]
+
+
+def python_keyword_search_batch(
+    db: Session,
+    workspace_id: int,
+    queries: List[str],
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[List[SearchHit]]:
+    """Fallback for several queries: one LIKE candidate query for all their terms, scored per query.
+    
+    Every candidate is scored, streamed in batches of FALLBACK_FETCH_ROWS,
+    and each query keeps only its best limit hits, so memory stays bounded
+    however many chunks match and no better match is ever left out.
+    """
+    query_terms = [set(WORD_PATTERN.findall(query.lower())) for query in queries]
+    all_terms = set().union(*query_terms)
+    if not all_terms or limit <= 0:
+        return [[] for _ in queries]
+    
+    queries_by_term: Dict[str, List[int]] = {}
+    for position, terms in enumerate(query_terms):
+        for term in terms:
+            queries_by_term.setdefault(term, []).append(position)
+    
+    candidates = db.query(
+        Document.id, Document.filename, Document.created_at, Chunk.id, Chunk.text
+    ).join(Chunk, Chunk.blob_id == Document.blob_id).filter(
+        Document.workspace_id == workspace_id,
+        or_(*[Chunk.text.ilike(f"%{escape_like(term)}%", escape="\\") for term in sorted(all_terms)]),
+        *document_filter_clauses(filters)
+    ).yield_per(FALLBACK_FETCH_ROWS)
+    
+    # Min-heaps of the best hits so far; ties go to the lower chunk id
+    best: List[list] = [[] for _ in queries]
+    for candidate in candidates:
+        # Count the candidate's words once for every query it matches
+        words = WORD_PATTERN.findall(candidate[4].lower())
+        counts = Counter(word for word in words if word in all_terms)
+        matched = {position for term in counts for position in queries_by_term[term]}
+        for position in matched:
+            terms = query_terms[position]
+            # Reward matching more of the query over repeating one term, and damp long chunks
+            score = sum(1 + math.log(counts[term]) for term in terms if term in counts) / math.log(len(words) + math.e)
+            entry = (score, -candidate[3], candidate[0], tuple(candidate))
+            if len(best[position]) < limit:
+                heapq.heappush(best[position], entry)
+            elif entry > best[position][0]:
+                heapq.heapreplace(best[position], entry)
+    
+    results = []
+    for terms, heap in zip(query_terms, best):
+        hits = []
+        for score, _, _, (document_id, filename, created_at, chunk_id, chunk_text) in sorted(heap, reverse=True):
+            hits.append(SearchHit(
+                document_id=document_id,
+                chunk_id=chunk_id,
+                score=score,
+                snippet=highlight(chunk_text, terms),
+                filename=filename,
+                created_at=created_at
+            ))
+        results.append(hits)
+    return results
+
+
+def semantic_search(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[SearchHit]:
+    """Nearest chunks to the query embedding in the workspace's vector index"""
+    return semantic_search_batch(db, workspace_id, [query], limit, filters)[0]
+
+
+def semantic_search_batch(
+    db: Session,
+    workspace_id: int,
+    queries: List[str],
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[List[SearchHit]]:
+    """Nearest chunks for several queries, embedded together and scored in one pass over the index"""
+    results: List[List[SearchHit]] = [[] for _ in queries]
+    positions = [position for position, query in enumerate(queries) if query.strip()]
+    if not positions or limit <= 0:
+        return results
+    
+    # Restrict the scan to the content of the filtered documents
+    clauses = document_filter_clauses(filters)
+    blob_ids = None
+    if clauses:
+        blob_ids = [
+            row.blob_id
+            for row in db.query(Document.blob_id).filter(
+                Document.workspace_id == workspace_id,
+                Document.blob_id.isnot(None),
+                *clauses
+            ).distinct()
+        ]
+        if not blob_ids:
+            return results
+    
+    index = sync_vector_index(db, workspace_id)
+    query_vectors = get_embedder().embed([queries[position] for position in positions])
+    # Over-fetch: rows of just-deleted documents linger until the next sync
+    all_matches = index.search_batch(query_vectors, 2 * limit, settings.vector_index_nprobe, blob_ids)
+    chunk_ids = {chunk_id for matches in all_matches for chunk_id, _ in matches}
+    if not chunk_ids:
+        return results
+    
+    rows = db.query(
+        Document.id, Document.filename, Document.created_at, Chunk.id, Chunk.text
+    ).join(Chunk, Chunk.blob_id == Document.blob_id).filter(
+        Document.workspace_id == workspace_id,
+        Chunk.id.in_(chunk_ids),
+        *clauses
+    ).order_by(Document.id).all()
+    documents_by_chunk = {}
+    for row in rows:
+        documents_by_chunk.setdefault(row[3], []).append(row)
+    
+    for position, matches in zip(positions, all_matches):
+        hits = []
+        for chunk_id, score in matches:
+            for document_id, filename, created_at, _, chunk_text in documents_by_chunk.get(chunk_id, []):
+                hits.append(SearchHit(
+                    document_id=document_id,
+                    chunk_id=chunk_id,
+                    score=score,
+                    snippet=" ".join(chunk_text.split()[:SNIPPET_WORDS]),
+                    filename=filename,
+                    created_at=created_at
+                ))
+        results[position] = hits[:limit]
+    return results
+
+
+def keyword_search_batch(
+    db: Session,
+    workspace_id: int,
+    queries: List[str],
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> List[List[SearchHit]]:
+    """Keyword search for several queries in one round trip"""
+    if limit <= 0:
+        return [[] for _ in queries]
+    
+    if db.get_bind().dialect.name == "postgresql":
+        return postgres_keyword_search_batch(db, workspace_id, queries, limit, filters)
+    return python_keyword_search_batch(db, workspace_id, queries, limit, filters)
+
+
+SearchLeg = Callable[[Session, int, str, int, Optional[SearchFilters]], List[SearchHit]]
+
+SEARCH_LEGS: Dict[str, SearchLeg] = {
+    "keyword": keyword_search,
+    "semantic": semantic_search,
+}
+
+BatchSearchLeg = Callable[[Session, int, List[str], int, Optional[SearchFilters]], List[List[SearchHit]]]
+
+BATCH_SEARCH_LEGS: Dict[str, BatchSearchLeg] = {
+    "keyword": keyword_search_batch,
+    "semantic": semantic_search_batch,
+}
+
+
+def reciprocal_rank_fusion(rankings: List[List[SearchHit]], limit: int) -> List[SearchHit]:
+    """Merge ranked lists by summing 1 / (RRF_K + rank) per chunk of a document"""
+    scores: Dict[Tuple[int, int], float] = {}
+    hits: Dict[Tuple[int, int], SearchHit] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = (hit.document_id, hit.chunk_id)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            # Keep the first leg's hit, so keyword snippets with highlights win
+            hits.setdefault(key, hit)
+    
+    fused = sorted(scores, key=lambda key: (-scores[key], key[1], key[0]))[:limit]
+    return [replace(hits[key], score=scores[key]) for key in fused]
+
+
+def run_leg(
+    name: str,
+    workspace_id: int,
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> Tuple[List[SearchHit], float]:
+    """Run one retriever on its own session, returning its hits and milliseconds taken"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        hits = SEARCH_LEGS[name](db, workspace_id, query, limit, filters)
+    finally:
+        db.close()
+    return hits, (time.perf_counter() - started) * 1000
+
+
+async def run_search(
+    workspace_id: int,
+    query: str,
+    mode: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> Tuple[List[SearchHit], Dict[str, float]]:
+    """Search in the given mode, returning hits and per-stage timings in milliseconds.
+    
+    Hybrid mode runs the keyword and semantic legs concurrently in the
+    threadpool, so its latency is close to the slower leg, not their sum.
+    """
+    legs = ["keyword", "semantic"] if mode == "hybrid" else [mode]
+    leg_limit = min(limit * HYBRID_CANDIDATE_FACTOR, MAX_SEARCH_LIMIT) if mode == "hybrid" else limit
+    
+    results = await asyncio.gather(*[
+        run_in_threadpool(run_leg, name, workspace_id, query, leg_limit, filters)
+        for name in legs
+    ])
+    timings = {name: elapsed for name, (_, elapsed) in zip(legs, results)}
+    
+    if mode != "hybrid":
+        return results[0][0], timings
+    
+    started = time.perf_counter()
+    hits = reciprocal_rank_fusion([leg_hits for leg_hits, _ in results], limit)
+    timings["fusion"] = (time.perf_counter() - started) * 1000
+    return hits, timings
+
+
+def run_leg_batch(
+    name: str,
+    workspace_id: int,
+    queries: List[str],
+    limit: int,
+    filters: Optional[SearchFilters] = None
+) -> Tuple[List[List[SearchHit]], float]:
+    """Run one retriever for several queries on its own session, returning their hits and milliseconds taken"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        hits = BATCH_SEARCH_LEGS[name](db, workspace_id, queries, limit, filters)
+    finally:
+        db.close()
+    return hits, (time.perf_counter() - started) * 1000
+
+
+async def run_search_batch(
+    workspace_id: int,
+    searches: List[Tuple[str, str, int, Optional[SearchFilters]]]
+) -> Tuple[List[List[SearchHit]], Dict[str, float]]:
+    """Run (query, mode, limit, filters) searches together, returning hits per search and timings.
+    
+    Searches are grouped by leg and filters, and each group runs as one
+    batch: the keyword fallback fetches candidates once for all its queries
+    and the semantic leg scores all of them in a single pass over the index.
+    """
+    groups: Dict[Tuple[str, str], dict] = {}
+    for position, (query, mode, limit, filters) in enumerate(searches):
+        legs = ["keyword", "semantic"] if mode == "hybrid" else [mode]
+        leg_limit = min(limit * HYBRID_CANDIDATE_FACTOR, MAX_SEARCH_LIMIT) if mode == "hybrid" else limit
+        filters_key = json.dumps(filters.model_dump(mode="json", exclude_none=True) if filters else None, sort_keys=True)
+        for name in legs:
+            group = groups.setdefault((name, filters_key), {"filters": filters, "queries": {}, "limit": 0, "searches": []})
+            # Identical queries in a group are only run once
+            group["queries"].setdefault(query, len(group["queries"]))
+            group["limit"] = max(group["limit"], leg_limit)
+            group["searches"].append((position, query, leg_limit))
+    
+    results = await asyncio.gather(*[
+        run_in_threadpool(run_leg_batch, name, workspace_id, list(group["queries"]), group["limit"], group["filters"])
+        for (name, _), group in groups.items()
+    ])
+    
+    timings: Dict[str, float] = {}
+    leg_hits: List[Dict[str, List[SearchHit]]] = [{} for _ in searches]
+    for ((name, _), group), (group_hits, elapsed) in zip(groups.items(), results):
+        timings[name] = timings.get(name, 0.0) + elapsed
+        for position, query, leg_limit in group["searches"]:
+            leg_hits[position][name] = group_hits[group["queries"][query]][:leg_limit]
+    
+    started = time.perf_counter()
+    hits = [
+        reciprocal_rank_fusion([legs["keyword"], legs["semantic"]], limit) if mode == "hybrid" else legs[mode]
+        for (_, mode, limit, _), legs in zip(searches, leg_hits)
+    ]
+    if any(mode == "hybrid" for _, mode, _, _ in searches):
+        timings["fusion"] = (time.perf_counter() - started) * 1000
+    return hits, timings
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from config import settings
+from services.search import SearchHit
+
+CACHE_KEY_PREFIX = "search:"
+STATS_KEY = "search-cache-stats"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+def search_cache_key(
+    workspace_id: int,
+    generation: int,
+    query: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]],
+    limit: int
+) -> str:
+    """Cache key covering everything that changes a search's results"""
+    material = json.dumps(
+        [workspace_id, generation, normalize_query(query), mode, filters or {}, limit],
+        sort_keys=True,
+        default=str
+    )
+    return CACHE_KEY_PREFIX + hashlib.sha256(material.encode()).hexdigest()
+
+
+class SearchCache(ABC):
+    """Stores search hits by key and counts hits and misses"""
+    
+    backend: str
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[List[SearchHit]]:
+        """Cached hits for the key, or None on a miss"""
+    
+    @abstractmethod
+    def set(self, key: str, hits: List[SearchHit]) -> None:
+        """Store hits under the key"""
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts and the resulting hit rate"""
+
+
+def hit_rate_stats(backend: str, hits: int, misses: int, entries: Optional[int]) -> Dict[str, Any]:
+    lookups = hits + misses
+    return {
+        "backend": backend,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "entries": entries,
+    }
+
+
+class MemorySearchCache(SearchCache):
+    """LRU cache with a TTL, private to this process"""
+    
+    backend = "memory"
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, tuple[float, List[SearchHit]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[List[SearchHit]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: str, hits: List[SearchHit]) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, hits)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return hit_rate_stats(self.backend, self.hits, self.misses, len(self.entries))
+
+
+class RedisSearchCache(SearchCache):
+    """Cache shared by every worker through Redis.
+    
+    Entries expire after the TTL; configure Redis with an allkeys-lru
+    maxmemory policy to bound its size. Hit and miss counters are kept in
+    Redis too, so the stats cover all workers.
+    """
+    
+    backend = "redis"
+    
+    def __init__(self, url: str, ttl_seconds: float):
+        import redis
+        
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+    
+    def get(self, key: str) -> Optional[List[SearchHit]]:
+        value = self.client.get(key)
+        self.client.hincrby(STATS_KEY, "misses" if value is None else "hits", 1)
+        if value is None:
+            return None
+        return [
+            SearchHit(**{**hit, "created_at": datetime.fromisoformat(hit["created_at"])})
+            for hit in json.loads(value)
+        ]
+    
+    def set(self, key: str, hits: List[SearchHit]) -> None:
+        value = json.dumps([asdict(hit) for hit in hits], default=lambda value: value.isoformat())
+        self.client.set(key, value, px=int(self.ttl_seconds * 1000))
+    
+    def stats(self) -> Dict[str, Any]:
+        counters = self.client.hgetall(STATS_KEY)
+        return hit_rate_stats(
+            self.backend,
+            int(counters.get(b"hits", 0)),
+            int(counters.get(b"misses", 0)),
+            None
+        )
+
+
+@lru_cache
+def get_search_cache() -> Optional[SearchCache]:
+    """Search result cache configured for this deployment, or None when disabled"""
+    if settings.search_cache_backend == "none":
+        return None
+    if settings.search_cache_backend == "memory":
+        return MemorySearchCache(settings.search_cache_max_entries, settings.search_cache_ttl_seconds)
+    if settings.search_cache_backend == "redis":
+        return RedisSearchCache(settings.redis_url, settings.search_cache_ttl_seconds)
+    raise ValueError(f"Unknown search cache backend: {settings.search_cache_backend}")
@@ -0,0 +1,41 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Optional
+from config import settings
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(purpose: str, body: str) -> bytes:
+    message = f"{purpose}:{body}".encode("ascii")
+    return hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).digest()
+
+
+def sign_token(purpose: str, payload: dict, expires_at: int) -> str:
+    """Create a compact HMAC-signed token carrying a payload and an expiry timestamp"""
+    body = _b64encode(json.dumps({**payload, "exp": expires_at}, separators=(",", ":")).encode("utf-8"))
+    return f"{body}.{_b64encode(_signature(purpose, body))}"
+
+
+def verify_token(purpose: str, token: str, now: Optional[float] = None) -> Optional[dict]:
+    """Return a signed token's payload, or None if it is forged, malformed or expired"""
+    try:
+        body, signature = token.split(".", 1)
+        if not hmac.compare_digest(_b64decode(signature), _signature(purpose, body)):
+            return None
+        payload = json.loads(_b64decode(body))
+    except (ValueError, UnicodeError):
+        return None
+    
+    if not isinstance(payload, dict) or payload.get("exp", 0) <= (now or time.time()):
+        return None
+    return payload
@@ -0,0 +1,427 @@
+import hashlib
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import closing
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, BinaryIO, List, Optional
+from urllib.parse import quote
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from config import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+S3_PART_SIZE = 8 * 1024 * 1024
+S3_MIN_PART_SIZE = 5 * 1024 * 1024  # S3 requires parts of at least 5MB except the last one
+
+
+@dataclass
+class UploadDigest:
+    """Size and SHA-256 of an upload, computed without buffering it"""
+    size_bytes: int
+    sha256: str
+
+
+class StorageWriter(ABC):
+    """Incremental writer for an object staged in a storage backend"""
+    
+    @abstractmethod
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk to the staged object"""
+    
+    @abstractmethod
+    def commit(self, key: str) -> None:
+        """Publish the staged object under its final key"""
+    
+    @abstractmethod
+    def abort(self) -> None:
+        """Discard the staged object"""
+
+
+class StorageBackend(ABC):
+    """Interface implemented by every document storage backend"""
+    
+    @abstractmethod
+    def open_writer(self) -> StorageWriter:
+        """Start staging a new object"""
+    
+    @abstractmethod
+    def open_reader(self, key: str) -> BinaryIO:
+        """Open a stored object for reading"""
+    
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Check whether an object is stored under a key"""
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete an object, ignoring keys that do not exist"""
+    
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of an object, for backends that keep objects on local disk"""
+        return None
+    
+    def presigned_url(self, key: str, filename: str, mime_type: str, expires_in: int) -> Optional[str]:
+        """Time-limited URL clients can fetch the object from directly, if the backend offers one"""
+        return None
+    
+    def compose(self, source_keys: List[str], key: str) -> None:
+        """Concatenate stored objects into a new object without holding them in memory"""
+        writer = self.open_writer()
+        try:
+            for source_key in source_keys:
+                with closing(self.open_reader(source_key)) as reader:
+                    for chunk in iter(lambda: reader.read(UPLOAD_CHUNK_SIZE), b""):
+                        writer.write(chunk)
+            writer.commit(key)
+        except BaseException:
+            writer.abort()
+            raise
+
+
+def content_disposition(filename: str) -> str:
+    """Content-Disposition header value that survives non-ASCII filenames"""
+    fallback = "".join(ch if 32 <= ord(ch) < 127 and ch not in '"\\' else "_" for ch in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def copy_file(src: BinaryIO, dst: BinaryIO) -> None:
+    """Append src to dst, letting the kernel move the bytes where supported"""
+    dst.flush()
+    size = os.fstat(src.fileno()).st_size
+    offset = 0
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError:
+            pass
+    if offset < size:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+
+class LocalFileWriter(StorageWriter):
+    def __init__(self, root: str, staging_dir: str):
+        self.root = root
+        self.staging_path = os.path.join(staging_dir, uuid.uuid4().hex)
+        self.fp = open(self.staging_path, "wb")
+    
+    def write(self, chunk: bytes) -> None:
+        self.fp.write(chunk)
+    
+    def append_file(self, path: str) -> None:
+        with open(path, "rb") as src:
+            copy_file(src, self.fp)
+    
+    def commit(self, key: str) -> None:
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+        self.fp.close()
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(self.staging_path, target)
+    
+    def abort(self) -> None:
+        self.fp.close()
+        try:
+            os.remove(self.staging_path)
+        except FileNotFoundError:
+            pass
+
+
+class LocalStorageBackend(StorageBackend):
+    """Stores objects as files below a root directory"""
+    
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.staging_dir = os.path.join(self.root, ".staging")
+        os.makedirs(self.staging_dir, exist_ok=True)
+    
+    def path_for(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+    
+    def local_path(self, key: str) -> Optional[str]:
+        return self.path_for(key)
+    
+    def open_writer(self) -> StorageWriter:
+        return LocalFileWriter(self.root, self.staging_dir)
+    
+    def open_reader(self, key: str) -> BinaryIO:
+        return open(self.path_for(key), "rb")
+    
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path_for(key))
+    
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+    
+    def compose(self, source_keys: List[str], key: str) -> None:
+        writer = LocalFileWriter(self.root, self.staging_dir)
+        try:
+            for source_key in source_keys:
+                writer.append_file(self.path_for(source_key))
+            writer.commit(key)
+        except BaseException:
+            writer.abort()
+            raise
+
+
+class S3MultipartWriter(StorageWriter):
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+        self.staging_key = f".staging/{uuid.uuid4().hex}"
+        self.buffer = bytearray()
+        self.upload_id: Optional[str] = None
+        self.parts = []
+    
+    def _flush_part(self) -> None:
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.staging_key)
+            self.upload_id = response["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.staging_key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(self.buffer),
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer.clear()
+    
+    def write(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+        if len(self.buffer) >= S3_PART_SIZE:
+            self._flush_part()
+    
+    def commit(self, key: str) -> None:
+        if self.upload_id is None:
+            # Small objects never leave the part buffer, so write them in one request
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(self.buffer))
+            self.buffer.clear()
+            return
+        if self.buffer:
+            self._flush_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.staging_key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=key,
+            CopySource={"Bucket": self.bucket, "Key": self.staging_key},
+        )
+        self.client.delete_object(Bucket=self.bucket, Key=self.staging_key)
+    
+    def abort(self) -> None:
+        self.buffer.clear()
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.staging_key, UploadId=self.upload_id)
+
+
+class S3StorageBackend(StorageBackend):
+    """Stores objects in an S3-compatible bucket (AWS S3, MinIO, ...)"""
+    
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+    ):
+        import boto3
+        
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+    
+    def presigned_url(self, key: str, filename: str, mime_type: str, expires_in: int) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseContentType": mime_type,
+                "ResponseContentDisposition": content_disposition(filename),
+            },
+            ExpiresIn=expires_in,
+        )
+    
+    def open_writer(self) -> StorageWriter:
+        return S3MultipartWriter(self.client, self.bucket)
+    
+    def open_reader(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+    
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+    
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+    
+    def compose(self, source_keys: List[str], key: str) -> None:
+        sizes = [self.client.head_object(Bucket=self.bucket, Key=k)["ContentLength"] for k in source_keys]
+        if len(source_keys) == 1:
+            self.client.copy_object(Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": source_keys[0]})
+            return
+        if any(size < S3_MIN_PART_SIZE for size in sizes[:-1]):
+            # Server-side part copies need 5MB parts, so stream small parts through instead
+            super().compose(source_keys, key)
+            return
+        
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+        try:
+            parts = []
+            for part_number, source_key in enumerate(source_keys, start=1):
+                response = self.client.upload_part_copy(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    CopySource={"Bucket": self.bucket, "Key": source_key},
+                )
+                parts.append({"ETag": response["CopyPartResult"]["ETag"], "PartNumber": part_number})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """Storage backend dependency for FastAPI"""
+    if settings.storage_backend == "s3":
+        return S3StorageBackend(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+        )
+    if settings.storage_backend == "local":
+        return LocalStorageBackend(settings.storage_root)
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+
+
+def file_too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File too large. Maximum size: {max_size / 1024 / 1024}MB"
+    )
+
+
+async def digest_upload(file: UploadFile, max_size: int) -> UploadDigest:
+    """Hash an upload in fixed-size chunks, enforcing max_size as it goes"""
+    too_large = file_too_large(max_size)
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > max_size:
+        raise too_large
+    
+    await file.seek(0)
+    digest = hashlib.sha256()
+    size_bytes = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size_bytes += len(chunk)
+        if size_bytes > max_size:
+            raise too_large
+        digest.update(chunk)
+    
+    return UploadDigest(size_bytes=size_bytes, sha256=digest.hexdigest())
+
+
+def digest_objects(storage: StorageBackend, keys: List[str]) -> UploadDigest:
+    """Hash the concatenation of stored objects in fixed-size chunks"""
+    digest = hashlib.sha256()
+    size_bytes = 0
+    for key in keys:
+        with closing(storage.open_reader(key)) as reader:
+            for chunk in iter(lambda: reader.read(UPLOAD_CHUNK_SIZE), b""):
+                size_bytes += len(chunk)
+                digest.update(chunk)
+    return UploadDigest(size_bytes=size_bytes, sha256=digest.hexdigest())
+
+
+async def write_stream(
+    chunks: AsyncIterator[bytes],
+    storage: StorageBackend,
+    key: str,
+    max_size: int,
+    too_large: Optional[HTTPException] = None
+) -> UploadDigest:
+    """Stream an async byte iterator into storage, hashing it and enforcing max_size as it goes"""
+    writer = await run_in_threadpool(storage.open_writer)
+    digest = hashlib.sha256()
+    size_bytes = 0
+    buffer = bytearray()
+    try:
+        async for chunk in chunks:
+            size_bytes += len(chunk)
+            if size_bytes > max_size:
+                raise too_large or file_too_large(max_size)
+            digest.update(chunk)
+            buffer.extend(chunk)
+            # Network chunks are small, so batch them before handing off to the thread pool
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(writer.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(writer.write, bytes(buffer))
+        await run_in_threadpool(writer.commit, key)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
+    
+    return UploadDigest(size_bytes=size_bytes, sha256=digest.hexdigest())
+
+
+async def write_upload(file: UploadFile, storage: StorageBackend, key: str) -> None:
+    """Stream an upload into storage under key in fixed-size chunks"""
+    await file.seek(0)
+    writer = await run_in_threadpool(storage.open_writer)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_in_threadpool(writer.write, chunk)
+        await run_in_threadpool(writer.commit, key)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
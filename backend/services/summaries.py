@@ -0,0 +1,400 @@
+import hashlib
+import json
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from multiprocessing.util import Finalize
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.blob import Blob
+from models.chunk import Chunk
+from models.document import Document
+from models.job import Job, JobType
+from models.summary import Summary
+from services.events import format_event
+from services.queue import PermanentJobError, job_handler
+from services.summarizer import get_summarizer
+
+
+class SummaryError(Exception):
+    """The requested summary cannot be generated"""
+
+
+def normalize_instructions(instructions: Optional[str]) -> str:
+    return " ".join((instructions or "").split())
+
+
+def summary_cache_key(
+    content_hash: str,
+    chunk_ids: Optional[List[int]],
+    instructions: str,
+    model_version: str
+) -> str:
+    """Cache key covering everything that changes a generated summary"""
+    material = json.dumps([content_hash, chunk_ids, instructions, model_version])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Lets one caller per key run at a time in this process; the others wait for it"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[str, threading.Event] = {}
+    
+    @contextmanager
+    def lead(self, key: str) -> Iterator[bool]:
+        """Yield True to the caller that should do the work for the key; others wait for it, then get False"""
+        with self.lock:
+            done = self.calls.get(key)
+            leader = done is None
+            if leader:
+                done = self.calls[key] = threading.Event()
+        
+        if not leader:
+            done.wait()
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            with self.lock:
+                del self.calls[key]
+            done.set()
+    
+    def run(self, key: str, fn: Callable[[], None]) -> bool:
+        """Run fn unless another caller is running it for the key; True if this caller ran it"""
+        with self.lead(key) as leader:
+            if leader:
+                fn()
+        return leader
+
+
+SUMMARY_FLIGHTS = SingleFlight()
+
+
+@lru_cache
+def get_summary_executor() -> Executor:
+    """Pool bounding how many summarizer calls run at once in this process.
+    
+    Threads only overlap calls that wait on IO, since the GIL runs Python
+    code one thread at a time, so CPU-bound backends get a process pool
+    instead. Their calls and inputs must pickle, and each call pays for
+    sending its texts to the child and the summary back. Children are
+    spawned rather than forked, as the API and worker processes run threads,
+    so they import the app's modules once on start and entry scripts need a
+    __main__ guard.
+    """
+    if get_summarizer().cpu_bound:
+        executor = ProcessPoolExecutor(
+            max_workers=settings.summary_max_concurrency,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        # Processes started by multiprocessing, like the worker's job processes,
+        # wait for their children on exit without running the hook that stops
+        # this pool. Stop it first, ahead of the finalizers that close its
+        # queues (priority 10).
+        Finalize(executor, executor.shutdown, exitpriority=20)
+        return executor
+    return ThreadPoolExecutor(max_workers=settings.summary_max_concurrency, thread_name_prefix="summarizer")
+
+
+def save_summary(
+    db: Session,
+    key: str,
+    blob_id: int,
+    content_hash: str,
+    chunk_ids: Optional[List[int]],
+    instructions: str,
+    model_version: str,
+    summary_text: str
+) -> Summary:
+    """Store a generated summary, keeping the existing row if another request stored it first"""
+    summary = Summary(
+        cache_key=key,
+        blob_id=blob_id,
+        content_hash=content_hash,
+        chunk_ids=json.dumps(chunk_ids) if chunk_ids is not None else None,
+        instructions=instructions,
+        model_version=model_version,
+        summary_text=summary_text
+    )
+    try:
+        with db.begin_nested():
+            db.add(summary)
+    except IntegrityError:
+        summary = db.query(Summary).filter(Summary.cache_key == key).first()
+    return summary
+
+
+def summarize_level(
+    db: Session,
+    blob_id: int,
+    content_hash: str,
+    nodes: List[List[int]],
+    load_inputs: Callable[[List[int]], List[List[str]]],
+    combine: Callable[[List[str]], str]
+) -> List[str]:
+    """Summaries of consecutive runs of chunks, reusing cached ones and generating the rest in parallel.
+    
+    Each node is the chunk ids it covers; load_inputs(positions) returns the
+    texts to combine for those nodes. A node's summary is exactly what a
+    request for its chunks without instructions returns, so it is cached
+    under that key. combine may run in another process, so it must pickle.
+    """
+    summarizer = get_summarizer()
+    keys = [summary_cache_key(content_hash, sorted(node), "", summarizer.model_version) for node in nodes]
+    texts = {
+        row.cache_key: row.summary_text
+        for row in db.query(Summary.cache_key, Summary.summary_text).filter(Summary.cache_key.in_(keys))
+    }
+    
+    missing = [position for position, key in enumerate(keys) if key not in texts]
+    # Load inputs a window at a time, so an uncached document is never read into memory whole
+    window = 4 * settings.summary_max_concurrency
+    for start in range(0, len(missing), window):
+        positions = missing[start:start + window]
+        outputs = get_summary_executor().map(combine, load_inputs(positions))
+        for position, output in zip(positions, outputs):
+            node = sorted(nodes[position])
+            save_summary(db, keys[position], blob_id, content_hash, node, "", summarizer.model_version, output)
+            texts[keys[position]] = output
+    return [texts[key] for key in keys]
+
+
+def summary_inputs(db: Session, blob_id: int, content_hash: str, chunk_ids: List[int]) -> Tuple[List[str], bool]:
+    """Texts the final summary is made from, and whether they are partial summaries to merge.
+    
+    Small requests are summarized straight from their chunks. Larger ones
+    are summarized in batches (map), and the partial summaries merged
+    fan-in at a time (reduce) until one merge is left. Intermediate
+    summaries do not depend on the instructions, which only steer the
+    final step, so variants of a request reuse them.
+    """
+    summarizer = get_summarizer()
+    batch_size = settings.summary_map_batch_chunks
+    fan_in = settings.summary_reduce_fan_in
+    
+    def chunk_texts(ids: List[int]) -> Dict[int, str]:
+        return dict(db.query(Chunk.id, Chunk.text).filter(Chunk.id.in_(ids)).all())
+    
+    if len(chunk_ids) <= batch_size:
+        texts = chunk_texts(chunk_ids)
+        return [texts[chunk_id] for chunk_id in chunk_ids], False
+    
+    nodes = [chunk_ids[start:start + batch_size] for start in range(0, len(chunk_ids), batch_size)]
+    
+    def load_batches(positions: List[int]) -> List[List[str]]:
+        texts = chunk_texts([chunk_id for position in positions for chunk_id in nodes[position]])
+        return [[texts[chunk_id] for chunk_id in nodes[position]] for position in positions]
+    
+    parts = summarize_level(db, blob_id, content_hash, nodes, load_batches, partial(summarizer.summarize, instructions=""))
+    
+    while len(parts) > fan_in:
+        groups = [range(start, min(start + fan_in, len(parts))) for start in range(0, len(parts), fan_in)]
+        child_parts = parts
+        nodes = [[chunk_id for child in group for chunk_id in nodes[child]] for group in groups]
+        parts = summarize_level(
+            db,
+            blob_id,
+            content_hash,
+            nodes,
+            lambda positions: [[child_parts[child] for child in groups[position]] for position in positions],
+            partial(summarizer.merge, instructions="")
+        )
+    return parts, True
+
+
+def map_reduce_summary(
+    db: Session,
+    blob_id: int,
+    content_hash: str,
+    chunk_ids: List[int],
+    instructions: str
+) -> str:
+    """Summary of the chunks, in order, built by map-reduce for long inputs"""
+    summarizer = get_summarizer()
+    texts, merging = summary_inputs(db, blob_id, content_hash, chunk_ids)
+    return summarizer.merge(texts, instructions) if merging else summarizer.summarize(texts, instructions)
+
+
+def resolve_summary_key(
+    db: Session,
+    document: Document,
+    chunk_ids: Optional[List[int]],
+    instructions: Optional[str]
+) -> Tuple[str, str, Optional[List[int]], str]:
+    """Cache key of a summary request, with the content hash, chunk ids and instructions it covers"""
+    if document.blob_id is None:
+        raise SummaryError("Document has no stored content")
+    
+    content_hash = db.query(Blob.content_hash).filter(Blob.id == document.blob_id).scalar()
+    instructions = normalize_instructions(instructions)
+    if chunk_ids is not None:
+        chunk_ids = sorted(set(chunk_ids))
+    key = summary_cache_key(content_hash, chunk_ids, instructions, get_summarizer().model_version)
+    return key, content_hash, chunk_ids, instructions
+
+
+def summary_chunk_ids(db: Session, document: Document, chunk_ids: Optional[List[int]]) -> List[int]:
+    """Ids of the requested chunks, or all of the document's, in text order"""
+    chunks = db.query(Chunk.id).filter(Chunk.blob_id == document.blob_id)
+    if chunk_ids is not None:
+        chunks = chunks.filter(Chunk.id.in_(chunk_ids))
+    ordered_ids = [row.id for row in chunks.order_by(Chunk.chunk_index)]
+    if chunk_ids is not None and len(ordered_ids) != len(chunk_ids):
+        raise SummaryError("Chunks not found for this document")
+    if not ordered_ids:
+        raise SummaryError("Document text is not extracted yet")
+    return ordered_ids
+
+
+def generate_summary(
+    db: Session,
+    document: Document,
+    chunk_ids: Optional[List[int]],
+    instructions: Optional[str]
+) -> Tuple[Summary, bool]:
+    """Cached summary of a document's content or some of its chunks, generating and storing it on a miss.
+    
+    Returns the summary and whether it came from the cache. Nothing is
+    committed.
+    """
+    key, content_hash, chunk_ids, instructions = resolve_summary_key(db, document, chunk_ids, instructions)
+    summary = db.query(Summary).filter(Summary.cache_key == key).first()
+    if summary is not None:
+        return summary, True
+    
+    ordered_ids = summary_chunk_ids(db, document, chunk_ids)
+    summary_text = map_reduce_summary(db, document.blob_id, content_hash, ordered_ids, instructions)
+    summary = save_summary(
+        db, key, document.blob_id, content_hash, chunk_ids, instructions, get_summarizer().model_version, summary_text
+    )
+    return summary, False
+
+
+def get_or_create_summary(
+    db: Session,
+    document: Document,
+    chunk_ids: Optional[List[int]],
+    instructions: Optional[str]
+) -> Tuple[Summary, bool]:
+    """Cached or newly generated summary, generating each summary once however many requests ask for it.
+    
+    Concurrent requests for the same summary in this process wait for a
+    single generation; across processes the unique cache key lets the first
+    insert win. Commits the new summary so waiting requests can read it.
+    """
+    key = resolve_summary_key(db, document, chunk_ids, instructions)[0]
+    result: List[Tuple[Summary, bool]] = []
+    
+    def generate() -> None:
+        result.append(generate_summary(db, document, chunk_ids, instructions))
+        db.commit()
+    
+    while True:
+        summary = db.query(Summary).filter(Summary.cache_key == key).first()
+        if summary is not None:
+            return summary, True
+        # Waiters look again once the generation they waited for is done, and
+        # take over if it failed
+        if SUMMARY_FLIGHTS.run(key, generate):
+            return result[0]
+
+
+def summary_document(db: Session, document_id: int) -> Document:
+    """The document to summarize; it may have been deleted since the request's access check"""
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if document is None:
+        raise SummaryError("Document not found")
+    return document
+
+
+def get_or_create_document_summary(
+    document_id: int,
+    chunk_ids: Optional[List[int]],
+    instructions: Optional[str]
+) -> Tuple[Summary, bool]:
+    """get_or_create_summary on its own session, for running in a thread off the request's session"""
+    db = SessionLocal()
+    try:
+        document = summary_document(db, document_id)
+        summary, cached = get_or_create_summary(db, document, chunk_ids, instructions)
+        # Load what the commit expired before the session goes away
+        db.refresh(summary)
+        return summary, cached
+    finally:
+        db.close()
+
+
+def stream_summary(document_id: int, chunk_ids: Optional[List[int]], instructions: Optional[str]) -> Iterator[str]:
+    """Server-Sent Events for a summary: "delta" events with text as it is produced, then "done".
+    
+    A cached summary arrives as a single delta. Otherwise only the final
+    summarizer step is streamed, after any map-reduce stages it needs, and
+    the joined pieces are cached. Failures are sent as an "error" event,
+    since the response has already started. Runs on its own session.
+    """
+    db = SessionLocal()
+    try:
+        document = summary_document(db, document_id)
+        key, content_hash, chunk_ids, instructions = resolve_summary_key(db, document, chunk_ids, instructions)
+        while True:
+            summary = db.query(Summary).filter(Summary.cache_key == key).first()
+            cached = summary is not None
+            if summary is None:
+                with SUMMARY_FLIGHTS.lead(key) as leader:
+                    if not leader:
+                        continue
+                    
+                    summarizer = get_summarizer()
+                    ordered_ids = summary_chunk_ids(db, document, chunk_ids)
+                    texts, merging = summary_inputs(db, document.blob_id, content_hash, ordered_ids)
+                    pieces = []
+                    for piece in (summarizer.stream_merge if merging else summarizer.stream)(texts, instructions):
+                        pieces.append(piece)
+                        yield format_event({"event": "delta", "data": {"text": piece}})
+                    summary = save_summary(
+                        db,
+                        key,
+                        document.blob_id,
+                        content_hash,
+                        chunk_ids,
+                        instructions,
+                        summarizer.model_version,
+                        "".join(pieces)
+                    )
+                    db.commit()
+            else:
+                yield format_event({"event": "delta", "data": {"text": summary.summary_text}})
+            
+            yield format_event({"event": "done", "data": {
+                "created_at": summary.created_at.isoformat(),
+                "cached": cached,
+                "model_version": summary.model_version,
+            }})
+            return
+    except SummaryError as e:
+        yield format_event({"event": "error", "data": {"code": "SUMMARY_UNAVAILABLE", "message": str(e)}})
+    except Exception as e:
+        yield format_event({"event": "error", "data": {"code": "SUMMARY_GENERATION_FAILED", "message": str(e)}})
+    finally:
+        db.close()
+
+
+@job_handler(JobType.SUMMARIZATION)
+def summarize_document(db: Session, job: Job) -> None:
+    """Generate a document's default summary, so the first request for it is a cache hit"""
+    document = db.query(Document).filter(Document.id == job.document_id).first()
+    if document is None or document.blob_id is None:
+        raise PermanentJobError("Document has no stored content")
+    
+    try:
+        generate_summary(db, document, None, None)
+    except SummaryError as e:
+        raise PermanentJobError(str(e))
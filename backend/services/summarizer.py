@@ -0,0 +1,88 @@
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from typing import Iterator, List
+from config import settings
+
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+WORD_PATTERN = re.compile(r"\w+")
+# Words this short carry little topical weight
+MIN_KEYWORD_LENGTH = 4
+
+
+class Summarizer(ABC):
+    """Condenses text into a summary"""
+    
+    # Part of every summary cache key; change it whenever the output changes
+    model_version: str
+    # Whether calls spend their time computing in Python rather than waiting
+    # on IO, which decides if they run in processes or threads
+    cpu_bound: bool = False
+    
+    @abstractmethod
+    def summarize(self, texts: List[str], instructions: str) -> str:
+        """Summary of consecutive pieces of text, steered by the instructions"""
+    
+    def merge(self, summaries: List[str], instructions: str) -> str:
+        """Combine summaries of consecutive parts of a text into one"""
+        return self.summarize(summaries, instructions)
+    
+    def stream(self, texts: List[str], instructions: str) -> Iterator[str]:
+        """summarize() in pieces, as they are produced"""
+        yield self.summarize(texts, instructions)
+    
+    def stream_merge(self, summaries: List[str], instructions: str) -> Iterator[str]:
+        """merge() in pieces, as they are produced"""
+        yield from self.stream(summaries, instructions)
+
+
+class ExtractiveSummarizer(Summarizer):
+    """Deterministic local summarizer: the highest scoring sentences, in text order.
+    
+    Sentences score by how frequent their words are across the text, and
+    words from the instructions count extra, so they steer the selection.
+    """
+    
+    cpu_bound = True
+    
+    def __init__(self, max_sentences: int):
+        self.max_sentences = max_sentences
+        self.model_version = f"extractive-v1-{max_sentences}"
+    
+    def _keywords(self, text: str) -> List[str]:
+        return [word for word in WORD_PATTERN.findall(text.lower()) if len(word) >= MIN_KEYWORD_LENGTH]
+    
+    def summarize(self, texts: List[str], instructions: str) -> str:
+        return "".join(self.stream(texts, instructions))
+    
+    def stream(self, texts: List[str], instructions: str) -> Iterator[str]:
+        """Chosen sentences one at a time"""
+        sentences = [
+            sentence.strip()
+            for text in texts
+            for sentence in SENTENCE_PATTERN.findall(text)
+            if WORD_PATTERN.search(sentence)
+        ]
+        if not sentences:
+            return
+        
+        frequencies = Counter(word for sentence in sentences for word in self._keywords(sentence))
+        focus = set(self._keywords(instructions))
+        scores = []
+        for position, sentence in enumerate(sentences):
+            words = self._keywords(sentence)
+            score = sum(frequencies[word] * (3 if word in focus else 1) for word in set(words)) / (len(words) + 1)
+            scores.append((score, -position))
+        
+        chosen = sorted(-position for _, position in sorted(scores, reverse=True)[:self.max_sentences])
+        for count, position in enumerate(chosen):
+            yield sentences[position] if count == 0 else " " + sentences[position]
+
+
+@lru_cache
+def get_summarizer() -> Summarizer:
+    """Summarization model configured for this deployment"""
+    if settings.summarizer_backend == "extractive":
+        return ExtractiveSummarizer(settings.summary_sentences)
+    raise ValueError(f"Unknown summarizer backend: {settings.summarizer_backend}")
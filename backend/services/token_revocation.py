@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from config import settings
+from database import AsyncSessionLocal, SessionLocal
+from models.revoked_token import RevokedToken
+from services.invalidations import listen_for_invalidations, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "token-revocations"
+
+# Ids below the highest seen that were not yet visible, because their
+# transaction had not committed, are polled for this long before giving up
+ID_GAP_SECONDS = 60.0
+
+# How often pollers rebuild the Bloom filter without expired ids
+REBUILD_SECONDS = 300.0
+# Rebuilds stream the unexpired ids from the database this many at a time
+REBUILD_FETCH_ROWS = 10000
+
+
+class BloomFilter:
+    """Fixed-size membership test with false positives at the given rate, but no false negatives"""
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+    
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenDenylist:
+    """Revoked token ids known to this process, held only as a Bloom filter.
+    
+    The filter answers almost every check from memory. Its rare false
+    positives, and the tokens actually revoked, are confirmed against the
+    revoked_tokens table (see is_token_revoked). A Bloom filter cannot
+    forget keys, so it is rebuilt from the table's unexpired rows
+    periodically and whenever it fills up, which keeps its false positive
+    rate near the configured one.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.last_id = 0
+        self.loaded = False
+        self.gaps: Dict[int, float] = {}
+        # Ids added while a rebuild reads the table, replayed into the new filter
+        self.rebuilding: Optional[List[str]] = None
+        self.lock = threading.Lock()
+    
+    def might_be_revoked(self, jti: str) -> bool:
+        return jti in self.bloom
+    
+    def add(self, jti: str) -> None:
+        with self.lock:
+            self.bloom.add(jti)
+            if self.rebuilding is not None:
+                self.rebuilding.append(jti)
+    
+    def needs_rebuild(self) -> bool:
+        return self.bloom.count >= self.bloom.capacity
+    
+    def rebuild(self, db: Session) -> None:
+        """Replace the filter with one holding only the unexpired revocations"""
+        with self.lock:
+            self.rebuilding = []
+        try:
+            query = db.query(RevokedToken.jti).filter(RevokedToken.expires_at > datetime.now(timezone.utc))
+            bloom = BloomFilter(max(self.capacity, 2 * query.count()), self.error_rate)
+            for row in query.yield_per(REBUILD_FETCH_ROWS):
+                bloom.add(row.jti)
+            # Build aside and swap in, so readers never see a partial filter
+            with self.lock:
+                for jti in self.rebuilding:
+                    bloom.add(jti)
+                self.bloom = bloom
+        finally:
+            with self.lock:
+                self.rebuilding = None
+    
+    def load(self, db: Session) -> None:
+        """Add revocations committed since the last load"""
+        now = time.monotonic()
+        self.gaps = {row_id: seen for row_id, seen in self.gaps.items() if now - seen < ID_GAP_SECONDS}
+        rows = db.query(RevokedToken.id, RevokedToken.jti).filter(
+            or_(RevokedToken.id > self.last_id, RevokedToken.id.in_(list(self.gaps))),
+            RevokedToken.expires_at > datetime.now(timezone.utc)
+        ).order_by(RevokedToken.id).all()
+        
+        for row in rows:
+            self.add(row.jti)
+            self.gaps.pop(row.id, None)
+            if row.id > self.last_id:
+                if self.loaded:
+                    self.gaps.update((missing, now) for missing in range(self.last_id + 1, row.id))
+                self.last_id = row.id
+        self.loaded = True
+
+
+def poll_revocations(denylist: TokenDenylist) -> None:
+    """Load other workers' revocations from the database every few seconds, in a background thread"""
+    def poll() -> None:
+        rebuilt_at = time.monotonic()
+        while True:
+            time.sleep(settings.token_denylist_sync_seconds)
+            try:
+                with SessionLocal() as db:
+                    denylist.load(db)
+                    if denylist.needs_rebuild() or time.monotonic() - rebuilt_at >= REBUILD_SECONDS:
+                        denylist.rebuild(db)
+                        rebuilt_at = time.monotonic()
+            except Exception:
+                logger.exception("Could not load token revocations")
+    
+    threading.Thread(target=poll, name=INVALIDATION_CHANNEL, daemon=True).start()
+
+
+@lru_cache
+def get_token_denylist() -> TokenDenylist:
+    """Token denylist for this process, loaded from the database and kept in sync.
+    
+    The app loads it at startup, off the event loop; the first call does a
+    blocking query.
+    """
+    denylist = TokenDenylist(settings.token_denylist_capacity, settings.token_denylist_error_rate)
+    with SessionLocal() as db:
+        denylist.load(db)
+    
+    listen_for_invalidations(INVALIDATION_CHANNEL, denylist.add)
+    if settings.token_denylist_sync_seconds > 0:
+        poll_revocations(denylist)
+    return denylist
+
+
+async def is_token_revoked(jti: Optional[str]) -> bool:
+    """Whether a token id has been revoked.
+    
+    Answered from memory unless the Bloom filter matches, which only
+    happens for revoked tokens and at the filter's false positive rate;
+    those are confirmed with one indexed query.
+    """
+    if jti is None or not get_token_denylist().might_be_revoked(jti):
+        return False
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)) is not None
+
+
+async def revoke_token(db: AsyncSession, jti: str, user_id: Optional[int], expires_at: int) -> bool:
+    """Add a token id to the denylist in the current transaction.
+    
+    Returns False if it was already revoked, which makes revocation a safe
+    single-use check under concurrent requests. Call broadcast_revocation
+    after committing.
+    """
+    try:
+        async with db.begin_nested():
+            db.add(RevokedToken(
+                jti=jti,
+                user_id=user_id,
+                expires_at=datetime.fromtimestamp(expires_at, timezone.utc)
+            ))
+    except IntegrityError:
+        return False
+    return True
+
+
+def broadcast_revocation(jti: str) -> None:
+    """Reject a committed revocation here at once, and in other workers as soon as they hear of it.
+    
+    Workers without a channel pick it up from the database within
+    TOKEN_DENYLIST_SYNC_SECONDS.
+    """
+    get_token_denylist().add(jti)
+    publish_invalidation(INVALIDATION_CHANNEL, jti)
+
+
+def purge_expired_revocations(db: Session) -> int:
+    """Delete denylist rows for tokens that have expired anyway; runs periodically in the worker"""
+    count = db.query(RevokedToken).filter(
+        RevokedToken.expires_at <= datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from models.upload_session import UploadSession, UploadSessionStatus, UploadPart
+from services.storage import StorageBackend
+
+
+def part_key(session_id: int, part_number: int) -> str:
+    """Storage key for one received part; unique per attempt so retries never clobber a committed part"""
+    return f"uploads/{session_id}/{part_number}-{uuid.uuid4().hex}"
+
+
+def is_expired(session: UploadSession) -> bool:
+    expires_at = session.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc)
+
+
+async def delete_part_objects(storage: StorageBackend, storage_paths: List[str]) -> None:
+    """Delete stored part objects once their rows are gone"""
+    for storage_path in storage_paths:
+        await run_in_threadpool(storage.delete, storage_path)
+
+
+def drop_parts(db: Session, session: UploadSession) -> List[str]:
+    """Delete a session's part rows, returning the storage paths to delete after commit"""
+    parts = db.query(UploadPart.storage_path).filter(UploadPart.session_id == session.id).all()
+    db.query(UploadPart).filter(UploadPart.session_id == session.id).delete(synchronize_session=False)
+    return [part.storage_path for part in parts]
+
+
+def purge_expired_upload_sessions(db: Session, storage: StorageBackend) -> int:
+    """Delete unfinished upload sessions past their expiry, with their parts.
+    
+    Completed sessions are kept, so a retried complete still finds its
+    document. Runs periodically in the worker.
+    """
+    sessions = db.query(UploadSession).filter(
+        UploadSession.status != UploadSessionStatus.COMPLETED,
+        UploadSession.expires_at <= datetime.now(timezone.utc)
+    ).with_for_update(skip_locked=True).all()
+    
+    storage_paths = []
+    for session in sessions:
+        storage_paths.extend(drop_parts(db, session))
+        db.delete(session)
+    db.commit()
+    
+    for storage_path in storage_paths:
+        storage.delete(storage_path)
+    return len(sessions)
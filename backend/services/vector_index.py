@@ -0,0 +1,418 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import and_, exists, update
+from sqlalchemy.orm import Session
+from config import settings
+from models.chunk import Chunk
+from models.document import Document
+from models.job import Job, JobType
+from services.embeddings import decode_embeddings, encode_embedding, get_embedder
+from services.queue import PermanentJobError, job_handler
+
+# Below this many rows a full scan is as fast as probing an IVF index
+IVF_MIN_ROWS = 10000
+# Retrain the IVF centroids once the index has grown this much since training
+IVF_RETRAIN_GROWTH = 4
+IVF_MAX_LISTS = 1024
+KMEANS_SAMPLE_SIZE = 20000
+KMEANS_ITERATIONS = 10
+SCORE_BLOCK_ROWS = 8192
+SYNC_BLOB_BATCH_SIZE = 100
+EMBEDDING_BATCH_SIZE = 256
+
+# Per-row arrays stored next to the vectors, appended in lockstep
+ROW_FILES = {
+    "chunk_ids": np.int64,
+    "blob_ids": np.int64,
+    "deleted": np.uint8,
+    "assign": np.int32,
+}
+
+
+class VectorIndex:
+    """Append-only, memory-mapped embedding matrix for one workspace.
+    
+    Rows are only ever appended; deletes set a tombstone byte in place. The
+    files are mapped read-only, so every process serving the workspace
+    shares one copy through the page cache. Writers hold an exclusive file
+    lock and publish each change by atomically replacing meta.json.
+    
+    Once large enough the rows are partitioned into IVF lists around
+    k-means centroids and searches only scan the nearest lists. New rows are
+    assigned to their nearest centroid; centroids are retrained only when the
+    index has grown IVF_RETRAIN_GROWTH times since they were trained.
+    """
+    
+    def __init__(self, path: str, model_name: str, dimension: int, dtype: str):
+        self.path = path
+        self.model_name = model_name
+        self.dimension = dimension
+        self.dtype = np.int8 if dtype == "int8" else np.float32
+        self.meta: Optional[dict] = None
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+    
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+    
+    @contextmanager
+    def write_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(self._file("lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta["model"] != self.model_name or meta["dtype"] != np.dtype(self.dtype).name:
+            return None
+        return meta
+    
+    def _write_meta(self, meta: dict) -> None:
+        meta["version"] = uuid.uuid4().hex
+        tmp_path = self._file("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file("meta.json"))
+    
+    def _map(self, name: str, dtype, count: int, width: Optional[int] = None, mode: str = "r") -> np.ndarray:
+        shape = (count, width) if width else (count,)
+        if count == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode=mode, shape=shape)
+    
+    def refresh(self) -> Optional[dict]:
+        """Map the latest published state of the index, if it changed"""
+        meta = self._read_meta()
+        if meta is None:
+            self.meta, self.arrays = None, {}
+            return None
+        if self.meta is not None and self.meta["version"] == meta["version"]:
+            return self.meta
+        
+        count = meta["count"]
+        arrays = {name: self._map(name, dtype, count) for name, dtype in ROW_FILES.items()}
+        arrays["vectors"] = self._map("vectors", self.dtype, count, self.dimension)
+        if self.dtype == np.int8:
+            arrays["scales"] = self._map("scales", np.float32, count)
+        if meta["nlist"]:
+            arrays["centroids"] = self._map("centroids", np.float32, meta["nlist"], self.dimension)
+        self.meta, self.arrays = meta, arrays
+        return meta
+    
+    def _reset(self) -> dict:
+        """Start over, e.g. after the embedding model changed"""
+        for name in os.listdir(self.path):
+            if name != "lock":
+                os.remove(self._file(name))
+        return {
+            "model": self.model_name,
+            "dtype": np.dtype(self.dtype).name,
+            "dimension": self.dimension,
+            "count": 0,
+            "deleted": 0,
+            "nlist": 0,
+            "trained_count": 0,
+        }
+    
+    def _append(self, meta: dict, chunk_ids: np.ndarray, blob_ids: np.ndarray, vectors: np.ndarray) -> None:
+        count = meta["count"]
+        names = list(ROW_FILES) + ["vectors"] + (["scales"] if self.dtype == np.int8 else [])
+        # Drop anything a crashed writer appended without publishing it
+        for name in names:
+            if os.path.exists(self._file(name)):
+                width = self.dimension if name == "vectors" else 1
+                itemsize = np.dtype(self.dtype if name == "vectors" else ROW_FILES.get(name, np.float32)).itemsize
+                os.truncate(self._file(name), count * width * itemsize)
+        
+        rows = {
+            "chunk_ids": chunk_ids.astype(np.int64),
+            "blob_ids": blob_ids.astype(np.int64),
+            "deleted": np.zeros(len(chunk_ids), dtype=np.uint8),
+            "assign": self._assign(meta, vectors),
+        }
+        if self.dtype == np.int8:
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+            rows["vectors"] = np.round(vectors / scales[:, None]).astype(np.int8)
+            rows["scales"] = scales.astype(np.float32)
+        else:
+            rows["vectors"] = vectors.astype(np.float32)
+        
+        for name in names:
+            with open(self._file(name), "ab") as f:
+                f.write(np.ascontiguousarray(rows[name]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        meta["count"] = count + len(chunk_ids)
+        
+        if meta["count"] >= IVF_MIN_ROWS and meta["count"] >= IVF_RETRAIN_GROWTH * meta["trained_count"]:
+            self._train(meta)
+    
+    def _assign(self, meta: dict, vectors: np.ndarray) -> np.ndarray:
+        if not meta["nlist"]:
+            return np.zeros(len(vectors), dtype=np.int32)
+        centroids = self._map("centroids", np.float32, meta["nlist"], self.dimension)
+        return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+    
+    def _rows(self, meta: dict, index) -> np.ndarray:
+        """Selected rows as float32, dequantized if needed"""
+        vectors = self._map("vectors", self.dtype, meta["count"], self.dimension)[index]
+        if self.dtype == np.int8:
+            scales = self._map("scales", np.float32, meta["count"])[index]
+            return vectors.astype(np.float32) * scales[:, None]
+        return np.asarray(vectors)
+    
+    def _train(self, meta: dict) -> None:
+        """Spherical k-means on a sample, then reassign every row to a list"""
+        count = meta["count"]
+        nlist = min(int(np.sqrt(count)), IVF_MAX_LISTS)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, size=min(count, KMEANS_SAMPLE_SIZE), replace=False))
+        sample = self._rows(meta, sample_rows)
+        
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            # Lists that lost all their members keep their previous centroid
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        centroids = centroids.astype(np.float32)
+        
+        with open(self._file("assign.tmp"), "wb") as f:
+            for start in range(0, count, SCORE_BLOCK_ROWS):
+                labels = np.argmax(self._rows(meta, slice(start, start + SCORE_BLOCK_ROWS)) @ centroids.T, axis=1)
+                f.write(labels.astype(np.int32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._file("centroids.tmp"), "wb") as f:
+            f.write(centroids.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # Readers keep the old files mapped until they see the new meta.json
+        os.replace(self._file("assign.tmp"), self._file("assign"))
+        os.replace(self._file("centroids.tmp"), self._file("centroids"))
+        meta["nlist"] = nlist
+        meta["trained_count"] = count
+    
+    def _tombstone(self, meta: dict, blob_ids: Set[int]) -> None:
+        count = meta["count"]
+        rows = np.flatnonzero(np.isin(self._map("blob_ids", np.int64, count), list(blob_ids)))
+        if len(rows):
+            deleted = self._map("deleted", np.uint8, count, mode="r+")
+            deleted[rows] = 1
+            deleted.flush()
+            meta["deleted"] = int(np.count_nonzero(deleted))
+    
+    def sync(self, wanted_blob_ids: Set[int], load_rows) -> None:
+        """Tombstone blobs no longer wanted and append new ones fetched with load_rows(blob_ids)"""
+        with self.write_lock():
+            meta = self._read_meta() or self._reset()
+            count = meta["count"]
+            blob_ids = self._map("blob_ids", np.int64, count)
+            live = self._map("deleted", np.uint8, count) == 0
+            present = set(np.unique(blob_ids[live]).tolist())
+            
+            removed = present - wanted_blob_ids
+            added = sorted(wanted_blob_ids - present)
+            if not removed and not added:
+                return
+            
+            if removed:
+                self._tombstone(meta, removed)
+            for start in range(0, len(added), SYNC_BLOB_BATCH_SIZE):
+                chunk_ids, row_blob_ids, vectors = load_rows(added[start:start + SYNC_BLOB_BATCH_SIZE])
+                if len(chunk_ids):
+                    self._append(meta, chunk_ids, row_blob_ids, vectors)
+            self._write_meta(meta)
+    
+    def search(
+        self,
+        query_vector: np.ndarray,
+        k: int,
+        nprobe: int,
+        blob_ids: Optional[List[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """(chunk id, cosine similarity) of the k nearest live rows, optionally only of the given blobs"""
+        return self.search_batch(query_vector[None, :], k, nprobe, blob_ids)[0]
+    
+    def search_batch(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        nprobe: int,
+        blob_ids: Optional[List[int]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """Nearest live rows for each query, scoring every query with one product per block of rows.
+        
+        A running top k per query is merged block by block, so memory stays
+        bounded by the block size whatever the number of rows.
+        """
+        meta = self.refresh()
+        if meta is None or meta["count"] == meta["deleted"] or k <= 0 or not len(query_vectors):
+            return [[] for _ in query_vectors]
+        
+        arrays = self.arrays
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        live = arrays["deleted"] == 0
+        rows = None
+        if blob_ids is not None:
+            rows = np.flatnonzero(np.isin(arrays["blob_ids"], blob_ids) & live)
+        
+        # IVF lists each query may read; small filtered sets are scanned exactly
+        listed = None
+        if meta["nlist"] and (rows is None or len(rows) > IVF_MIN_ROWS):
+            probes = np.argsort(queries @ arrays["centroids"].T, axis=1)[:, -nprobe:]
+            listed = np.zeros((len(queries), meta["nlist"]), dtype=bool)
+            np.put_along_axis(listed, probes, True, axis=1)
+            if rows is None:
+                rows = np.flatnonzero(np.isin(arrays["assign"], np.unique(probes)) & live)
+            else:
+                # Queries whose probes hold too few of the filtered rows read all of them
+                per_list = np.bincount(arrays["assign"][rows], minlength=meta["nlist"])
+                listed[per_list[probes].sum(axis=1) < k] = True
+        
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        total = len(rows) if rows is not None else meta["count"]
+        for start in range(0, total, SCORE_BLOCK_ROWS):
+            if rows is not None:
+                block = block_rows = rows[start:start + SCORE_BLOCK_ROWS]
+            else:
+                # Scan contiguous slices of the mapping rather than copying rows out
+                block = slice(start, min(start + SCORE_BLOCK_ROWS, total))
+                block_rows = np.arange(block.start, block.stop)
+            
+            scores = self._score(arrays, block, queries)
+            if rows is None:
+                scores[:, ~live[block]] = -np.inf
+            if listed is not None:
+                scores[~listed[:, arrays["assign"][block]]] = -np.inf
+            
+            candidates = np.concatenate([best_scores, scores], axis=1)
+            candidate_rows = np.concatenate([best_rows, np.broadcast_to(block_rows, scores.shape)], axis=1)
+            top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(candidates, top, axis=1)
+            best_rows = np.take_along_axis(candidate_rows, top, axis=1)
+        
+        results = []
+        for scores, row_ids in zip(best_scores, best_rows):
+            ranking = [i for i in np.argsort(-scores) if np.isfinite(scores[i])]
+            results.append([(int(arrays["chunk_ids"][row_ids[i]]), float(scores[i])) for i in ranking])
+        return results
+    
+    def _score(self, arrays: Dict[str, np.ndarray], block, queries: np.ndarray) -> np.ndarray:
+        """(queries, rows) cosine scores of a block of rows"""
+        vectors = arrays["vectors"][block]
+        if self.dtype == np.int8:
+            return (queries @ vectors.T.astype(np.float32)) * arrays["scales"][block]
+        return queries @ vectors.T
+
+
+VECTOR_INDEXES: Dict[int, VectorIndex] = {}
+VECTOR_INDEXES_LOCK = threading.Lock()
+
+
+def get_vector_index(workspace_id: int) -> VectorIndex:
+    """Process-wide handle on a workspace's index, so its files are mapped once"""
+    with VECTOR_INDEXES_LOCK:
+        index = VECTOR_INDEXES.get(workspace_id)
+        if index is None:
+            embedder = get_embedder()
+            index = VectorIndex(
+                os.path.join(settings.vector_index_root, f"workspace_{workspace_id}"),
+                embedder.model_name,
+                embedder.dimension,
+                settings.vector_index_dtype
+            )
+            VECTOR_INDEXES[workspace_id] = index
+        return index
+
+
+def embedded_blob_ids(db: Session, workspace_id: int) -> Set[int]:
+    """Blobs in a workspace whose chunks have been embedded"""
+    # Embeddings for a blob are committed together, so checking its first chunk is enough
+    rows = db.query(Document.blob_id).filter(
+        Document.workspace_id == workspace_id,
+        exists().where(and_(
+            Chunk.blob_id == Document.blob_id,
+            Chunk.chunk_index == 0,
+            Chunk.embedding.isnot(None)
+        ))
+    ).distinct().all()
+    return {row.blob_id for row in rows}
+
+
+def sync_vector_index(db: Session, workspace_id: int, force: bool = False) -> VectorIndex:
+    """Bring a workspace's index up to date with the database, at most every few seconds"""
+    index = get_vector_index(workspace_id)
+    if not force and time.monotonic() - index.synced_at < settings.vector_index_sync_seconds:
+        return index
+    
+    dimension = index.dimension
+    
+    def load_rows(blob_ids: List[int]):
+        rows = db.query(Chunk.id, Chunk.blob_id, Chunk.embedding).filter(
+            Chunk.blob_id.in_(blob_ids),
+            Chunk.embedding.isnot(None)
+        ).order_by(Chunk.id).all()
+        return (
+            np.array([row.id for row in rows], dtype=np.int64),
+            np.array([row.blob_id for row in rows], dtype=np.int64),
+            decode_embeddings([row.embedding for row in rows], dimension)
+        )
+    
+    index.sync(embedded_blob_ids(db, workspace_id), load_rows)
+    index.synced_at = time.monotonic()
+    return index
+
+
+@job_handler(JobType.EMBEDDING)
+def embed_document_chunks(db: Session, job: Job) -> None:
+    """Embed the chunks of a document's content that have no embedding yet"""
+    document = db.query(Document).filter(Document.id == job.document_id).first()
+    if document is None or document.blob_id is None:
+        raise PermanentJobError("Document has no stored content")
+    
+    embedder = get_embedder()
+    last_id = 0
+    while True:
+        chunks = db.query(Chunk.id, Chunk.text).filter(
+            Chunk.blob_id == document.blob_id,
+            Chunk.embedding.is_(None),
+            Chunk.id > last_id
+        ).order_by(Chunk.id).limit(EMBEDDING_BATCH_SIZE).all()
+        if not chunks:
+            break
+        
+        vectors = embedder.embed([chunk.text for chunk in chunks])
+        db.execute(update(Chunk), [
+            {"id": chunk.id, "embedding": encode_embedding(vector)}
+            for chunk, vector in zip(chunks, vectors)
+        ])
+        last_id = chunks[-1].id
+    
+    # Append to the workspace index here rather than on the next search, so
+    # queries do not pay for it. The index is a cache of the database: if this
+    # transaction rolls back, the next sync tombstones the rows again.
+    sync_vector_index(db, document.workspace_id, force=True)
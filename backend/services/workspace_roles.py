@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+from config import settings
+from models.workspace import WorkspaceRole
+from services.invalidations import listen_for_invalidations, publish_invalidation
+
+INVALIDATION_CHANNEL = "workspace-role-invalidations"
+
+# (user id, workspace id)
+RoleKey = Tuple[int, int]
+
+
+class WorkspaceRoleCache:
+    """Bounded TTL cache of each user's active role in a workspace, None for non-members"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[RoleKey, Tuple[float, Optional[WorkspaceRole]]]" = OrderedDict()
+        self.keys_by_workspace: Dict[int, Set[RoleKey]] = {}
+        self.lock = threading.Lock()
+    
+    def get(self, user_id: int, workspace_id: int) -> Tuple[bool, Optional[WorkspaceRole]]:
+        """Whether the role is cached, and the role"""
+        key = (user_id, workspace_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return False, None
+            self.entries.move_to_end(key)
+            return True, entry[1]
+    
+    def set(self, user_id: int, workspace_id: int, role: Optional[WorkspaceRole]) -> None:
+        key = (user_id, workspace_id)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, role)
+            self.entries.move_to_end(key)
+            self.keys_by_workspace.setdefault(workspace_id, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+    
+    def invalidate(self, workspace_id: int, user_id: Optional[int] = None) -> None:
+        """Forget one member's role, or every role in the workspace"""
+        with self.lock:
+            keys = [(user_id, workspace_id)] if user_id is not None else list(self.keys_by_workspace.get(workspace_id, ()))
+            for key in keys:
+                if key in self.entries:
+                    self._remove(key)
+    
+    def _remove(self, key: RoleKey) -> None:
+        del self.entries[key]
+        keys = self.keys_by_workspace[key[1]]
+        keys.discard(key)
+        if not keys:
+            del self.keys_by_workspace[key[1]]
+
+
+def apply_invalidation(cache: WorkspaceRoleCache, message: str) -> None:
+    workspace_id, _, user_id = message.partition(":")
+    cache.invalidate(int(workspace_id), int(user_id) if user_id else None)
+
+
+@lru_cache
+def get_workspace_role_cache() -> Optional[WorkspaceRoleCache]:
+    """Workspace role cache for this process, or None when disabled"""
+    if settings.workspace_role_cache_ttl_seconds <= 0:
+        return None
+    
+    cache = WorkspaceRoleCache(settings.workspace_role_cache_max_entries, settings.workspace_role_cache_ttl_seconds)
+    listen_for_invalidations(INVALIDATION_CHANNEL, lambda message: apply_invalidation(cache, message))
+    return cache
+
+
+def invalidate_workspace_roles(workspace_id: int, user_id: Optional[int] = None) -> None:
+    """Drop cached roles after a membership change, in every worker when a channel is configured.
+    
+    Call after committing the change. Pass no user to drop the whole
+    workspace, e.g. when it is deleted.
+    """
+    cache = get_workspace_role_cache()
+    if cache is None:
+        return
+    
+    cache.invalidate(workspace_id, user_id)
+    publish_invalidation(INVALIDATION_CHANNEL, f"{workspace_id}:{user_id if user_id is not None else ''}")
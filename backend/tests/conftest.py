@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so point them at a scratch database first
+SCRATCH = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{SCRATCH}/test.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, init_db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def scratch_dir():
+    init_db()
+    return SCRATCH
+
+
+@pytest.fixture
+def db(scratch_dir):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
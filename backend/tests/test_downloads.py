@@ -0,0 +1,77 @@
+import os
+import time
+import pytest
+from starlette.requests import Request
+from services.downloads import RangeNotSatisfiable, build_download_response, parse_range
+from services.storage import LocalStorageBackend
+
+CONTENT = b"0123456789"
+ETAG = "\"abc123\""
+
+
+def test_explicit_range():
+    assert parse_range("bytes=2-5", 10) == (2, 5)
+
+
+def test_open_ended_range_runs_to_the_end():
+    assert parse_range("bytes=4-", 10) == (4, 9)
+
+
+def test_suffix_range_counts_from_the_end():
+    assert parse_range("bytes=-3", 10) == (7, 9)
+    # A suffix longer than the file is the whole file
+    assert parse_range("bytes=-30", 10) == (0, 9)
+
+
+def test_end_past_the_file_is_clamped():
+    assert parse_range("bytes=8-100", 10) == (8, 9)
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,4-5", "bytes=5-2", "items=0-1", "bytes=abc", "bytes=1"])
+def test_multiple_and_malformed_ranges_are_ignored(header):
+    assert parse_range(header, 10) is None
+
+
+@pytest.mark.parametrize("header,size", [("bytes=10-", 10), ("bytes=20-30", 10), ("bytes=-0", 10), ("bytes=0-", 0)])
+def test_ranges_past_the_content_are_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+def download(tmp_path, headers):
+    storage = LocalStorageBackend(str(tmp_path))
+    path = storage.path_for("a.txt")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(CONTENT)
+    payload = {"p": "a.txt", "h": ETAG.strip("\""), "f": "a.txt", "m": "text/plain", "exp": time.time() + 60}
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+    })
+    return build_download_response(payload, request, storage)
+
+
+def test_range_is_served_as_partial_content(tmp_path):
+    response = download(tmp_path, {"range": "bytes=-3", "if-range": ETAG})
+    
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 7-9/10"
+    assert response.headers["content-length"] == "3"
+
+
+def test_if_range_mismatch_sends_the_whole_file(tmp_path):
+    response = download(tmp_path, {"range": "bytes=2-5", "if-range": "\"stale\""})
+    
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+
+def test_unsatisfiable_range_is_416(tmp_path):
+    response = download(tmp_path, {"range": "bytes=10-"})
+    
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
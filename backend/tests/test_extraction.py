@@ -0,0 +1,67 @@
+import tracemalloc
+import pytest
+from services.extraction import chunk_segments
+
+TEXT = " ".join(f"word{i}" for i in range(100))
+
+
+def split_segments(text, size):
+    return [(None, text[start:start + size]) for start in range(0, len(text), size)]
+
+
+def test_chunks_are_bounded_and_overlap():
+    chunks = list(chunk_segments([(None, TEXT)], max_tokens=10, overlap_tokens=3))
+    
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk.token_count <= 10 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.text.split()[-3:] == chunk.text.split()[:3]
+    # Every token is in some chunk, and the last chunk ends the text
+    assert chunks[0].start_offset == 0
+    assert chunks[-1].end_offset == len(TEXT)
+
+
+def test_offsets_index_the_concatenated_text():
+    chunks = list(chunk_segments(split_segments(TEXT, 37), max_tokens=10, overlap_tokens=3))
+    
+    assert all(TEXT[chunk.start_offset:chunk.end_offset] == chunk.text for chunk in chunks)
+
+
+def test_chunks_do_not_depend_on_how_the_text_is_split():
+    whole = list(chunk_segments([(None, TEXT)], max_tokens=10, overlap_tokens=3))
+    # Splits at whitespace, as the extractors never split a token
+    pieces = [(None, piece + " ") for piece in TEXT.split(" ")]
+    pieces[-1] = (None, pieces[-1][1].rstrip())
+    
+    assert list(chunk_segments(pieces, max_tokens=10, overlap_tokens=3)) == whole
+
+
+def test_page_numbers_come_from_each_chunk_start():
+    segments = [(1, "one two three "), (2, "four five six")]
+    chunks = list(chunk_segments(segments, max_tokens=2, overlap_tokens=0))
+    
+    assert [(chunk.page_number, chunk.text) for chunk in chunks] == [
+        (1, "one two"), (1, "three four"), (2, "five six")
+    ]
+
+
+def test_overlap_must_be_smaller_than_the_chunk():
+    with pytest.raises(ValueError):
+        list(chunk_segments([(None, TEXT)], max_tokens=5, overlap_tokens=5))
+
+
+def test_memory_stays_bounded_for_long_documents():
+    # 1 MB of text, generated lazily and consumed one chunk at a time
+    page = "lorem ipsum dolor sit amet " * 400
+    segments = ((number, page) for number in range(100))
+    
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in chunk_segments(segments, max_tokens=256, overlap_tokens=32))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    assert count > 800
+    # A small fraction of the text, however long the document
+    assert peak < 256 * 1024
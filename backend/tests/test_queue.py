@@ -0,0 +1,108 @@
+from datetime import timedelta
+import pytest
+from config import settings
+from models.document import Document
+from models.job import Job, JobStatus, JobType
+from services.queue import JOB_MAX_ATTEMPTS, claim_jobs, fail_job, retry_delay, utcnow
+
+LEASE_SECONDS = 60
+
+
+@pytest.fixture
+def document(db):
+    # Workers claim from the whole table, so start every test from an empty queue
+    db.query(Job).delete()
+    document = Document(
+        workspace_id=1,
+        uploaded_by=1,
+        filename="a.txt",
+        mime_type="text/plain",
+        size_bytes=1,
+        storage_path="a.txt"
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+
+def add_job(db, document, **fields):
+    job = Job(document_id=document.id, job_type=JobType.TEXT_EXTRACTION, **fields)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def claim(db, worker_id="worker"):
+    return claim_jobs(db, worker_id, [JobType.TEXT_EXTRACTION], 10, LEASE_SECONDS)
+
+
+def test_claim_skips_jobs_that_are_not_due(db, document):
+    due = add_job(db, document, next_run_at=utcnow() - timedelta(seconds=1))
+    later = add_job(db, document, status=JobStatus.FAILED, next_run_at=utcnow() + timedelta(hours=1))
+    
+    assert claim(db) == [due.id]
+    
+    db.refresh(due)
+    db.refresh(later)
+    assert (due.status, due.worker_id, due.attempts) == (JobStatus.RUNNING, "worker", 1)
+    assert later.status == JobStatus.FAILED
+    assert claim(db) == []
+
+
+def test_expired_lease_is_reclaimed(db, document):
+    crashed = add_job(db, document, status=JobStatus.RUNNING, worker_id="crashed", attempts=1, next_run_at=utcnow())
+    alive = add_job(
+        db,
+        document,
+        status=JobStatus.RUNNING,
+        worker_id="alive",
+        attempts=1,
+        next_run_at=utcnow() + timedelta(seconds=LEASE_SECONDS)
+    )
+    
+    assert claim(db, "replacement") == [crashed.id]
+    
+    db.refresh(crashed)
+    db.refresh(alive)
+    assert (crashed.worker_id, crashed.attempts) == ("replacement", 2)
+    assert alive.worker_id == "alive"
+
+
+def test_retry_delay_stays_within_its_bounds():
+    for attempts in range(1, 30):
+        backoff = min(settings.job_retry_max_seconds, settings.job_retry_base_seconds * 2 ** (attempts - 1))
+        for _ in range(20):
+            assert backoff / 2 <= retry_delay(attempts) <= backoff
+
+
+def test_failing_job_is_dead_lettered_after_its_max_attempts(db, document):
+    job = add_job(db, document)
+    
+    for attempt in range(1, JOB_MAX_ATTEMPTS[JobType.TEXT_EXTRACTION] + 1):
+        assert claim(db) == [job.id]
+        assert fail_job(db, job.id, "worker", "boom")
+        db.commit()
+        db.refresh(job)
+        if job.status == JobStatus.FAILED:
+            # Skip the backoff instead of waiting it out
+            job.next_run_at = utcnow() - timedelta(seconds=1)
+            db.commit()
+    
+    assert (job.status, job.attempts) == (JobStatus.DEAD_LETTER, attempt)
+    assert claim(db) == []
+
+
+def test_crashed_job_on_its_last_attempt_is_dead_lettered_not_rerun(db, document):
+    job = add_job(
+        db,
+        document,
+        status=JobStatus.RUNNING,
+        worker_id="crashed",
+        attempts=JOB_MAX_ATTEMPTS[JobType.TEXT_EXTRACTION],
+        next_run_at=utcnow()
+    )
+    
+    assert claim(db) == []
+    
+    db.refresh(job)
+    assert job.status == JobStatus.DEAD_LETTER
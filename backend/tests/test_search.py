@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+from models.blob import Blob
+from models.chunk import Chunk
+from models.document import Document, DocumentStatus
+from services.search import WORD_PATTERN, highlight, keyword_search, run_search, run_search_batch
+
+# Each test searches its own workspace, so tests sharing the database don't see each other's chunks
+WORKSPACE_IDS = itertools.count(1000)
+
+
+def add_document(db, workspace_id, texts, filename="a.txt"):
+    """A document whose blob is chunked into the given texts, in order"""
+    blob = Blob(content_hash=f"{workspace_id}-{filename}".ljust(64, "0"), storage_path=filename, size_bytes=1)
+    db.add(blob)
+    db.flush()
+    document = Document(
+        workspace_id=workspace_id,
+        uploaded_by=1,
+        filename=filename,
+        mime_type="text/plain",
+        size_bytes=1,
+        storage_path=filename,
+        blob_id=blob.id,
+        status=DocumentStatus.READY
+    )
+    db.add(document)
+    chunks = [
+        Chunk(blob_id=blob.id, chunk_index=index, start_offset=0, end_offset=len(text), token_count=1, text=text)
+        for index, text in enumerate(texts)
+    ]
+    db.add_all(chunks)
+    db.commit()
+    return document, chunks
+
+
+def test_word_pattern_splits_on_punctuation():
+    assert WORD_PATTERN.findall("cats, dogs-and birds.") == ["cats", "dogs", "and", "birds"]
+
+
+def test_scores_rank_more_matched_terms_above_repeats_of_one(db):
+    workspace_id = next(WORKSPACE_IDS)
+    _, chunks = add_document(db, workspace_id, [
+        "cats cats sleep here now",
+        "cats dogs sleep here now",
+        "nothing relevant in this one",
+    ])
+    
+    hits = keyword_search(db, workspace_id, "cats dogs", 10)
+    
+    assert [hit.chunk_id for hit in hits] == [chunks[1].id, chunks[0].id]
+    assert hits[0].score > hits[1].score
+
+
+def test_shorter_chunks_rank_above_longer_ones_for_the_same_matches(db):
+    workspace_id = next(WORKSPACE_IDS)
+    _, chunks = add_document(db, workspace_id, ["cats " + "filler " * 50, "cats sleep"])
+    
+    hits = keyword_search(db, workspace_id, "cats", 10)
+    
+    assert [hit.chunk_id for hit in hits] == [chunks[1].id, chunks[0].id]
+
+
+def test_substring_matches_are_not_hits(db):
+    workspace_id = next(WORKSPACE_IDS)
+    add_document(db, workspace_id, ["concatenate the scattered strings"])
+    
+    assert keyword_search(db, workspace_id, "cat", 10) == []
+
+
+def test_highlight_wraps_matches_and_keeps_punctuation():
+    assert highlight("The Cat sat. Dogs, too!", {"cat", "dogs"}) == "The <b>Cat</b> sat. <b>Dogs,</b> too!"
+
+
+def test_highlight_starts_near_the_first_match():
+    text = " ".join(f"w{i}" for i in range(100)) + " target"
+    snippet = highlight(text, {"target"})
+    
+    assert snippet.endswith("<b>target</b>")
+    assert not snippet.startswith("w0 ")
+
+
+def test_search_is_scoped_to_the_workspace(db):
+    workspace_id, other_workspace_id = next(WORKSPACE_IDS), next(WORKSPACE_IDS)
+    document, _ = add_document(db, workspace_id, ["cats purr"], filename="mine.txt")
+    add_document(db, other_workspace_id, ["cats purr loudly"], filename="theirs.txt")
+    
+    hits = keyword_search(db, workspace_id, "cats", 10)
+    
+    assert [hit.document_id for hit in hits] == [document.id]
+
+
+def test_limit_keeps_the_best_hits_even_past_many_weaker_candidates(db):
+    workspace_id = next(WORKSPACE_IDS)
+    # The best match has the highest chunk id, behind more weaker candidates
+    # than a fixed candidate cap would have read
+    texts = ["cats " + "filler " * 20] * 6000 + ["cats dogs"]
+    _, chunks = add_document(db, workspace_id, texts)
+    
+    hits = keyword_search(db, workspace_id, "cats dogs", 3)
+    
+    assert len(hits) == 3
+    assert hits[0].chunk_id == chunks[-1].id
+    # Equal scores keep the lower chunk ids
+    assert [hit.chunk_id for hit in hits[1:]] == [chunks[0].id, chunks[1].id]
+
+
+def test_limit_of_zero_returns_nothing(db):
+    workspace_id = next(WORKSPACE_IDS)
+    add_document(db, workspace_id, ["cats"])
+    
+    assert keyword_search(db, workspace_id, "cats", 0) == []
+
+
+def test_batch_returns_the_same_hits_as_single_searches(db):
+    workspace_id = next(WORKSPACE_IDS)
+    # A common term matching every chunk must not crowd out rarer queries in the batch
+    add_document(db, workspace_id, ["common " + "filler " * 10] * 200 + ["common rare words", "rare"])
+    searches = [(query, "keyword", limit, None) for query, limit in [("common", 5), ("rare", 10), ("words", 3), ("absent", 5)]]
+    
+    batch_hits, _ = asyncio.run(run_search_batch(workspace_id, searches))
+    
+    for (query, mode, limit, filters), hits in zip(searches, batch_hits):
+        single_hits, _ = asyncio.run(run_search(workspace_id, query, mode, limit, filters))
+        assert hits == single_hits
+    assert [len(hits) for hits in batch_hits] == [5, 2, 1, 0]
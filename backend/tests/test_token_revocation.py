@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from database import engine
+from models.revoked_token import RevokedToken
+from services.token_revocation import BloomFilter, TokenDenylist
+
+
+def add_revocation(db, row_id=None, expires_in=timedelta(hours=1)):
+    token = RevokedToken(id=row_id, jti=uuid.uuid4().hex, expires_at=datetime.now(timezone.utc) + expires_in)
+    db.add(token)
+    db.commit()
+    return token
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [uuid.uuid4().hex for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate_stays_near_the_target():
+    bloom = BloomFilter(1000, 0.01)
+    for _ in range(1000):
+        bloom.add(uuid.uuid4().hex)
+    
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    
+    assert false_positives < 300
+
+
+def test_load_picks_up_ids_committed_out_of_order(db):
+    start = (db.query(RevokedToken.id).order_by(RevokedToken.id.desc()).limit(1).scalar() or 0) + 100
+    denylist = TokenDenylist(1000, 0.001)
+    first = add_revocation(db, start)
+    denylist.load(db)
+    
+    # A later id commits while an earlier one is still in flight
+    late = RevokedToken(id=start + 1, jti=uuid.uuid4().hex, expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    third = add_revocation(db, start + 2)
+    denylist.load(db)
+    assert denylist.might_be_revoked(third.jti)
+    assert start + 1 in denylist.gaps
+    
+    db.add(late)
+    db.commit()
+    denylist.load(db)
+    
+    assert denylist.might_be_revoked(first.jti)
+    assert denylist.might_be_revoked(late.jti)
+    assert start + 1 not in denylist.gaps
+
+
+def test_rebuild_drops_expired_ids(db):
+    denylist = TokenDenylist(1000, 0.001)
+    live = add_revocation(db)
+    expired = add_revocation(db, expires_in=timedelta(hours=-1))
+    denylist.add(live.jti)
+    denylist.add(expired.jti)
+    
+    denylist.rebuild(db)
+    
+    assert denylist.might_be_revoked(live.jti)
+    assert not denylist.might_be_revoked(expired.jti)
+
+
+def test_rebuild_keeps_ids_added_while_it_reads_the_table(db):
+    denylist = TokenDenylist(1000, 0.001)
+    # Not yet committed when the rebuild reads the table, so only the add knows of it
+    jti = uuid.uuid4().hex
+    
+    def add_during_read(*args):
+        denylist.add(jti)
+    
+    event.listen(engine, "after_cursor_execute", add_during_read)
+    try:
+        denylist.rebuild(db)
+    finally:
+        event.remove(engine, "after_cursor_execute", add_during_read)
+    
+    assert denylist.might_be_revoked(jti)
+    assert denylist.rebuilding is None
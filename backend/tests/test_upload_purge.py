@@ -0,0 +1,44 @@
+import os
+from datetime import datetime, timedelta, timezone
+from models.upload_session import UploadSession, UploadSessionStatus, UploadPart
+from services.storage import LocalStorageBackend
+from services.uploads import purge_expired_upload_sessions
+
+
+def add_session(db, storage, status, expires_at):
+    session = UploadSession(
+        workspace_id=1,
+        user_id=1,
+        filename="a.txt",
+        mime_type="text/plain",
+        status=status,
+        expires_at=expires_at
+    )
+    db.add(session)
+    db.flush()
+    key = f"uploads/{session.id}/1-part"
+    path = storage.path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"part")
+    db.add(UploadPart(session_id=session.id, part_number=1, size_bytes=4, sha256="0" * 64, storage_path=key))
+    db.commit()
+    return session.id, key
+
+
+def test_purge_removes_expired_sessions_and_their_parts(db, scratch_dir):
+    storage = LocalStorageBackend(os.path.join(scratch_dir, "storage"))
+    now = datetime.now(timezone.utc)
+    expired_id, expired_key = add_session(db, storage, UploadSessionStatus.ACTIVE, now - timedelta(minutes=1))
+    live_id, live_key = add_session(db, storage, UploadSessionStatus.ACTIVE, now + timedelta(hours=1))
+    done_id, _ = add_session(db, storage, UploadSessionStatus.COMPLETED, now - timedelta(minutes=1))
+    
+    assert purge_expired_upload_sessions(db, storage) == 1
+    
+    assert db.get(UploadSession, expired_id) is None
+    assert db.query(UploadPart).filter(UploadPart.session_id == expired_id).count() == 0
+    assert not storage.exists(expired_key)
+    
+    assert db.get(UploadSession, live_id) is not None
+    assert storage.exists(live_key)
+    assert db.get(UploadSession, done_id) is not None
@@ -1,19 +1,29 @@
 from .auth import (
     verify_password,
     get_password_hash,
+    verify_and_update_password,
+    authenticate_password,
+    hash_password,
     create_access_token,
     create_refresh_token,
     decode_token,
+    bearer_token,
     get_current_user,
+    add_audit_log,
     create_audit_log,
 )
 
 __all__ = [
     "verify_password",
     "get_password_hash",
+    "verify_and_update_password",
+    "authenticate_password",
+    "hash_password",
     "create_access_token",
     "create_refresh_token",
     "decode_token",
+    "bearer_token",
     "get_current_user",
+    "add_audit_log",
     "create_audit_log",
 ]
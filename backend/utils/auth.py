@@ -1,18 +1,24 @@
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
 from database import get_db
 from models.user import User
+from services.password_hashing import HashingSaturated, get_hash_executor
+from services.principals import get_principal_cache
+from services.token_revocation import is_token_revoked
 
-SECRET_KEY = "CHANGE_THIS_TO_SECURE_SECRET_KEY"  # TODO: Move to config
+SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.password_hash_rounds)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,6 +31,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, also returning a new hash when the stored one uses outdated parameters"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def run_password_hashing(function, *args):
+    """Run a hashing call in the bounded pool, off the event loop"""
+    try:
+        return await get_hash_executor().run(function, *args)
+    except HashingSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def authenticate_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password without blocking the event loop, also returning a replacement hash if one is due"""
+    return await run_password_hashing(verify_and_update_password, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password for storage without blocking the event loop"""
+    return await run_password_hashing(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -32,7 +65,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": int(expire.timestamp())})
+    to_encode.update({"exp": int(expire.timestamp()), "jti": uuid.uuid4().hex, "type": "access"})
     # Convert sub to string if it's an integer
     if "sub" in to_encode and isinstance(to_encode["sub"], int):
         to_encode["sub"] = str(to_encode["sub"])
@@ -44,7 +77,7 @@ def create_refresh_token(data: dict) -> str:
     """Create a JWT refresh token"""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": int(expire.timestamp())})
+    to_encode.update({"exp": int(expire.timestamp()), "jti": uuid.uuid4().hex, "type": "refresh"})
     # Convert sub to string if it's an integer
     if "sub" in to_encode and isinstance(to_encode["sub"], int):
         to_encode["sub"] = str(to_encode["sub"])
@@ -52,24 +85,25 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
-def decode_token(token: str) -> dict:
-    """Decode and validate a JWT token"""
+async def decode_token(token: str, token_type: str = "access") -> dict:
+    """Decode and validate an unrevoked JWT token of the given type"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
+        payload = None
+    
+    # Tokens issued before token types were added are access tokens
+    if payload is None or payload.get("type", "access") != token_type or await is_token_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return payload
 
 
-async def get_current_user(
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the currently authenticated user from the bearer token"""
+def bearer_token(authorization: Optional[str]) -> str:
+    """Extract the token from an Authorization header"""
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,8 +123,16 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid authorization format: {str(e)}",
         )
-    
-    payload = decode_token(token)
+    return token
+
+
+async def get_current_user(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get the currently authenticated user from the bearer token"""
+    token = bearer_token(authorization)
+    payload = await decode_token(token)
     
     user_id: int = int(payload.get("sub", 0))
     if user_id == 0:
@@ -99,18 +141,29 @@ async def get_current_user(
             detail="Invalid token: missing user ID",
         )
     
-    user = db.query(User).filter(User.id == user_id, User.is_active == True, User.is_deleted == False).first()
+    # Cached users are merged into this session without a query, so
+    # endpoints can still change and commit them
+    cache = get_principal_cache()
+    cached_user = cache.get(user_id, token) if cache else None
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+    
+    user = await db.scalar(
+        select(User).where(User.id == user_id, User.is_active == True, User.is_deleted == False)
+    )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
         )
     
+    if cache:
+        cache.set(user_id, token, user)
     return user
 
 
-def create_audit_log(db: Session, user: User, action: str, object_type: str, object_id: Optional[int] = None, metadata: Optional[dict] = None):
-    """Create an audit log entry"""
+def add_audit_log(db: AsyncSession, user: User, action: str, object_type: str, object_id: Optional[int] = None, metadata: Optional[dict] = None):
+    """Add an audit log entry to the current transaction without committing it"""
     from models.audit_log import AuditLog
     
     log = AuditLog(
@@ -122,4 +175,10 @@ def create_audit_log(db: Session, user: User, action: str, object_type: str, obj
         metadata_json=metadata
     )
     db.add(log)
-    db.commit()
+    return log
+
+
+async def create_audit_log(db: AsyncSession, user: User, action: str, object_type: str, object_id: Optional[int] = None, metadata: Optional[dict] = None):
+    """Create an audit log entry"""
+    add_audit_log(db, user, action, object_type, object_id, metadata)
+    await db.commit()
@@ -0,0 +1,126 @@
+from typing import List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.document import Document
+from models.job import Job
+from models.user import User
+from models.workspace import Workspace, WorkspaceMember, WorkspaceRole, MemberStatus
+from services.workspace_roles import get_workspace_role_cache
+
+# Session.info key of the roles already resolved for the current request
+ROLE_MEMO_KEY = "workspace_roles"
+
+
+def active_member_of(user: User, workspace_id_column):
+    """Join condition for the user's active membership of a row's workspace"""
+    return and_(
+        WorkspaceMember.workspace_id == workspace_id_column,
+        WorkspaceMember.user_id == user.id,
+        WorkspaceMember.status == MemberStatus.ACTIVE
+    )
+
+
+def remember_role(db: AsyncSession, user: User, workspace_id: int, role: Optional[WorkspaceRole]) -> None:
+    db.info.setdefault(ROLE_MEMO_KEY, {})[(user.id, workspace_id)] = role
+    cache = get_workspace_role_cache()
+    if cache:
+        cache.set(user.id, workspace_id, role)
+
+
+async def workspace_role(db: AsyncSession, user: User, workspace_id: int) -> Optional[WorkspaceRole]:
+    """The user's active role in a workspace, or None if not a member.
+    
+    Memoized on the request's session and cached across requests; the cache
+    is invalidated whenever a membership changes.
+    """
+    memo = db.info.setdefault(ROLE_MEMO_KEY, {})
+    if (user.id, workspace_id) in memo:
+        return memo[(user.id, workspace_id)]
+    
+    cache = get_workspace_role_cache()
+    found, role = cache.get(user.id, workspace_id) if cache else (False, None)
+    if found:
+        memo[(user.id, workspace_id)] = role
+        return role
+    
+    role = await db.scalar(select(WorkspaceMember.role).where(active_member_of(user, workspace_id)))
+    remember_role(db, user, workspace_id, role)
+    return role
+
+
+def check_role(role: Optional[WorkspaceRole], required_roles: Optional[List[WorkspaceRole]], detail: str) -> None:
+    if role is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+    if required_roles and role not in required_roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+
+
+async def check_workspace_membership(
+    workspace_id: int,
+    user: User,
+    db: AsyncSession,
+    required_roles: Optional[List[WorkspaceRole]] = None
+) -> WorkspaceRole:
+    """Check that the user is an active member of the workspace, usually without a query"""
+    role = await workspace_role(db, user, workspace_id)
+    check_role(role, required_roles, "Not a member of this workspace")
+    return role
+
+
+async def check_workspace_access(
+    workspace_id: int,
+    user: User,
+    db: AsyncSession,
+    required_roles: Optional[List[WorkspaceRole]] = None
+) -> Workspace:
+    """Load a workspace together with the user's role in it, and check access"""
+    row = (await db.execute(select(Workspace, WorkspaceMember.role).outerjoin(
+        WorkspaceMember, active_member_of(user, Workspace.id)
+    ).where(Workspace.id == workspace_id))).first()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    
+    workspace, role = row
+    if workspace.tenant_id != user.tenant_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    
+    remember_role(db, user, workspace_id, role)
+    check_role(role, required_roles, "Not a member of this workspace")
+    return workspace
+
+
+async def check_document_access(document_id: int, user: User, db: AsyncSession) -> Document:
+    """Load a document together with the user's role in its workspace, and check access"""
+    row = (await db.execute(select(Document, WorkspaceMember.role).outerjoin(
+        WorkspaceMember, active_member_of(user, Document.workspace_id)
+    ).where(Document.id == document_id))).first()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    
+    document, role = row
+    remember_role(db, user, document.workspace_id, role)
+    check_role(role, None, "Access denied")
+    return document
+
+
+async def check_job_access(job_id: int, user: User, db: AsyncSession, lock: bool = False) -> Job:
+    """Load a job together with the user's role in its document's workspace, and check access"""
+    query = select(Job, Document.workspace_id, WorkspaceMember.role).outerjoin(
+        Document, Document.id == Job.document_id
+    ).outerjoin(
+        WorkspaceMember, active_member_of(user, Document.workspace_id)
+    ).where(Job.id == job_id)
+    if lock:
+        query = query.with_for_update(of=Job)
+    row = (await db.execute(query)).first()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    
+    job, workspace_id, role = row
+    if workspace_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    
+    remember_role(db, user, workspace_id, role)
+    check_role(role, None, "Access denied")
+    return job
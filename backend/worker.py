@@ -0,0 +1,151 @@
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+from config import settings
+from database import SessionLocal, engine, init_db
+from services.queue import JOB_HANDLERS, claim_jobs, extend_leases, execute_job, fail_job
+from services.storage import get_storage
+from services.token_revocation import purge_expired_revocations
+from services.uploads import purge_expired_upload_sessions
+# Importing the handler modules registers them with the queue
+import services.extraction  # noqa: F401
+import services.vector_index  # noqa: F401
+import services.summaries  # noqa: F401
+
+logger = logging.getLogger("worker")
+
+
+def init_worker_process():
+    """Drop database connections inherited from the parent process"""
+    engine.dispose(close=False)
+
+
+class Worker:
+    """Claims jobs from the database and runs them in a pool of processes.
+    
+    Workers need nothing but the database: start as many as needed, on as
+    many nodes as needed, against the same Postgres.
+    """
+    
+    def __init__(
+        self,
+        processes: int = settings.worker_processes,
+        batch_size: int = settings.worker_batch_size,
+        lease_seconds: int = settings.job_lease_seconds,
+        poll_interval: float = settings.worker_poll_interval_seconds,
+        maintenance_interval: float = settings.worker_maintenance_interval_seconds,
+        worker_id: Optional[str] = None
+    ):
+        self.processes = processes
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = min(poll_interval, lease_seconds / 3)
+        self.maintenance_interval = maintenance_interval
+        self.maintained_at: Optional[float] = None
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = False
+        self.in_flight: Dict[Future, int] = {}
+    
+    def stop(self, *args):
+        self.stopping = True
+    
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.processes, initializer=init_worker_process)
+    
+    def _claim(self, pool: ProcessPoolExecutor) -> None:
+        capacity = min(self.processes - len(self.in_flight), self.batch_size)
+        if capacity <= 0 or self.stopping:
+            return
+        
+        db = SessionLocal()
+        try:
+            job_ids = claim_jobs(db, self.worker_id, JOB_HANDLERS.keys(), capacity, self.lease_seconds)
+        finally:
+            db.close()
+        
+        for job_id in job_ids:
+            self.in_flight[pool.submit(execute_job, job_id, self.worker_id)] = job_id
+    
+    def _heartbeat(self) -> None:
+        db = SessionLocal()
+        try:
+            extend_leases(db, self.worker_id, list(self.in_flight.values()), self.lease_seconds)
+        finally:
+            db.close()
+    
+    def _maintain(self) -> None:
+        """Purge expired rows every maintenance interval; other workers skip rows being purged"""
+        now = time.monotonic()
+        if self.maintained_at is not None and now - self.maintained_at < self.maintenance_interval:
+            return
+        self.maintained_at = now
+        
+        db = SessionLocal()
+        try:
+            purged = purge_expired_upload_sessions(db, get_storage())
+            if purged:
+                logger.info("Purged %d expired upload sessions", purged)
+            purged = purge_expired_revocations(db)
+            if purged:
+                logger.info("Purged %d expired token revocations", purged)
+        except Exception:
+            db.rollback()
+            logger.exception("Periodic maintenance failed")
+        finally:
+            db.close()
+    
+    def _collect(self, futures) -> bool:
+        """Record finished futures; returns False if the process pool broke"""
+        pool_broken = False
+        for future in futures:
+            job_id = self.in_flight.pop(future)
+            try:
+                future.result()
+            except BrokenProcessPool:
+                pool_broken = True
+                db = SessionLocal()
+                try:
+                    fail_job(db, job_id, self.worker_id, "Worker process crashed")
+                    db.commit()
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Job %s raised outside its handler", job_id)
+        return not pool_broken
+    
+    def run(self) -> None:
+        logger.info("Worker %s running %d processes for %s", self.worker_id, self.processes, [t.value for t in JOB_HANDLERS])
+        pool = self._new_pool()
+        try:
+            while not self.stopping or self.in_flight:
+                self._claim(pool)
+                if not self.stopping:
+                    self._maintain()
+                if self.in_flight:
+                    self._heartbeat()
+                
+                done, _ = wait(list(self.in_flight), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                if not self._collect(done):
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._new_pool()
+        finally:
+            pool.shutdown(wait=True)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    init_db()
+    worker = Worker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
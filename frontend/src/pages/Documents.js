@@ -145,14 +145,13 @@ function Documents() {
         throw new Error('Failed to download document');
       }
 
-      const blob = await response.blob();
-      const url = window.URL.createObjectURL(blob);
+      // The response carries a signed, expiring link; the browser streams the file from it
+      const { url } = await response.json();
       const a = document.createElement('a');
-      a.href = url;
+      a.href = url.startsWith('/') ? `${API_URL}${url}` : url;
       a.download = filename;
       document.body.appendChild(a);
       a.click();
-      window.URL.revokeObjectURL(url);
       document.body.removeChild(a);
     } catch (err) {
       setError(err.message);